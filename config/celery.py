@@ -5,4 +5,8 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 app = Celery("config")
 app.config_from_object("django.conf:settings")
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+from shared.sql_profiler import install_celery_hooks  # noqa: E402
+
+install_celery_hooks()
\ No newline at end of file
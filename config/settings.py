@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # local apps
     'users',
@@ -52,6 +53,7 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'shared.sql_profiler.SQLProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -164,6 +166,29 @@ CACHES = {
         "LOCATION": os.getenv("DJANGO_CACHE_URL", default="redis://cache:6379/0"),
     }
 }
+# Upper bound of the process-wide shared.cache connection pool
+CACHE_MAX_CONNECTIONS = int(os.getenv("DJANGO_CACHE_MAX_CONNECTIONS", default=50))
+
+# Value encoding per shared.cache namespace (see shared.codecs), merged over "default".
+# codec: json | orjson | msgpack, compression: none | zstd | lz4 (applied above threshold bytes)
+CACHE_CODECS = {
+    "default": {
+        "codec": os.getenv("DJANGO_CACHE_CODEC", default="json"),
+        "compression": "none",
+        "threshold": 1024,
+    },
+    "orders": {
+        "compression": os.getenv("DJANGO_CACHE_ORDERS_COMPRESSION", default="none"),
+    },
+}
+
+# In-process LRU in front of Redis per namespace (see shared.near_cache): max entries and TTL in seconds.
+# Entries are invalidated across processes over the cache:invalidate pub/sub channel.
+CACHE_NEAR = {
+    "orders": {"size": 20_000, "ttl": 30},
+    "kfc_orders": {"size": 50_000, "ttl": 300},
+    "activation": {"size": 10_000, "ttl": 60},
+}
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = os.getenv("DJANGO_EMAIL_HOST", default="mailing")
@@ -172,17 +197,63 @@ EMAIL_PORT = int(os.getenv("DJANGO_EMAIL_PORT", default=1025))
 # EMAIL_HOST_PASSWORD = "mailpit"
 
 CELERY_BROKER_URL = os.getenv("DJANGO_BROKER_URL", default="redis://broker:6379/0")
+# Task payloads are plain versioned dicts (see food.messages), never pickles.
+# Switch to "msgpack" for smaller messages once the msgpack package is installed.
 CELERY_ACCEPT_CONTENT = [
-    "pickle",
     "application/json",
+    "application/x-msgpack",
 ]
-CELERY_TASK_SERIALIZER = "pickle"
-CELERY_EVENT_SERIALIZER = "pickle"
+CELERY_TASK_SERIALIZER = os.getenv("DJANGO_CELERY_SERIALIZER", default="json")
+CELERY_RESULT_SERIALIZER = "json"
+CELERY_EVENT_SERIALIZER = "json"
 CELERY_TASK_QUEUES = {
     "default": {"exchange": "default", "routing_key": "default"},
     "high_priority": {"exchange": "high_priority", "routing_key": "high_priority"},
 }
 
+# HTTP connection pools for restaurant/delivery providers (see food.providers.pool).
+# Provider entries override "default".
+PROVIDER_HTTP_POOLS = {
+    "default": {
+        "max_connections": int(os.getenv("PROVIDER_HTTP_MAX_CONNECTIONS", default=100)),
+        "max_keepalive_connections": int(os.getenv("PROVIDER_HTTP_MAX_KEEPALIVE", default=20)),
+        "keepalive_expiry": 30.0,
+        "connect_timeout": float(os.getenv("PROVIDER_HTTP_CONNECT_TIMEOUT", default=2.0)),
+        "read_timeout": float(os.getenv("PROVIDER_HTTP_READ_TIMEOUT", default=5.0)),
+        "retries": 3,
+        "backoff": 0.2,
+    },
+    "silpo": {},
+    "uklon": {},
+}
+
+# Per view/task query counts, DB time, slowest statements and repeated query
+# shapes (N+1) for a sampled share of requests, see shared.sql_profiler
+SQL_PROFILER = {
+    "sample_rate": float(os.getenv("DJANGO_SQL_PROFILER_SAMPLE_RATE", default=0.01)),
+    "buffer": 200,
+    "slowest": 5,
+    "repeat_threshold": 5,
+}
+
+# Multi-drop delivery batching (see food.delivery): cooked orders are collected
+# for "window" seconds and grouped per pickup restaurant into routes of at most
+# "max_stops" drop-offs that a driver can finish within "max_route_minutes".
+DELIVERY_BATCHING = {
+    "window": float(os.getenv("DELIVERY_BATCHING_WINDOW", default=30.0)),
+    "max_stops": int(os.getenv("DELIVERY_BATCHING_MAX_STOPS", default=4)),
+    "max_route_minutes": 45.0,
+    "max_detour_km": 3.0,
+    "speed_kmh": 25.0,
+    "stop_minutes": 5.0,
+}
+
+# Uploaded dish CSVs above this size are imported by a Celery task (see food.importer)
+DISH_IMPORT_SYNC_MAX_BYTES = int(os.getenv("DISH_IMPORT_SYNC_MAX_BYTES", default=1024 * 1024))
+
+# Approximate length cap of the webhooks:kfc stream, oldest events are trimmed first
+KFC_WEBHOOK_STREAM_MAXLEN = int(os.getenv("KFC_WEBHOOK_STREAM_MAXLEN", default=100_000))
+
 
 
 
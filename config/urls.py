@@ -20,14 +20,24 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from shared.views import sql_profiles
 from users.views import router as users_router
-from food.views import router as food_router, import_dishes, kfc_webhook
+from food.views import (
+    router as food_router,
+    import_dishes,
+    import_dishes_status,
+    kfc_webhook,
+    order_events,
+)
 
 urlpatterns = [
     path('admin/food/dish/import-dishes/', import_dishes, name="import_dishes"),
+    path('admin/food/dish/import-dishes/<str:job_id>/', import_dishes_status, name="import_dishes_status"),
+    path('admin/debug/sql-profiles/', sql_profiles, name="sql_profiles"),
     path('admin/', admin.site.urls),
     path('auth/token/', TokenObtainPairView.as_view(), name='obtain_token'),
     path('users/', include(users_router.urls)),
+    path('food/orders/<int:id>/events/', order_events, name="order_events"),
     path('food/', include(food_router.urls)),
     path('webhooks/kfc/', kfc_webhook, name="kfc_webhook"),
 ]
@@ -1,21 +1,44 @@
 from django.contrib import admin
 
-from .models import Dish, Order, OrderItem, Restaurant
+from .models import Dish, Order, OrderItem, OrderStatusHistory, Restaurant
+from .search import search_dishes
 
 admin.site.register(Restaurant)
-admin.site.register(OrderItem)
+
+@admin.register(OrderItem)
+class OrderItemAdmin(admin.ModelAdmin):
+    list_select_related = ("dish",)
 
 @admin.register(Dish)
 class DishAdmin(admin.ModelAdmin):
     list_display = ("name", "id", "price", "restaurant")
+    list_select_related = ("restaurant",)
     search_fields = ("name",)
     list_filter = ("name", "restaurant")
+    change_list_template = "admin/food/dish/change-list.html"
+
+    def get_search_results(self, request, queryset, search_term):
+        """Trigram index search instead of an ``icontains`` scan"""
+        if not search_term.strip():
+            return queryset, False
+
+        return search_dishes(search_term, dishes=queryset), False
 
 class DishOrderItemInline(admin.TabularInline):
     model = OrderItem
 
+class OrderStatusHistoryInline(admin.TabularInline):
+    model = OrderStatusHistory
+    readonly_fields = ("from_status", "to_status", "source", "created_at")
+    can_delete = False
+    extra = 0
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ("__str__", "id", "status")
-    inlines = (DishOrderItemInline, )
+    list_select_related = ("user",)
+    inlines = (DishOrderItemInline, OrderStatusHistoryInline)
 
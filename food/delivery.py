@@ -0,0 +1,224 @@
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from datetime import date
+
+from django.conf import settings
+
+from shared.cache import CacheService
+from . import events, state
+from .enums import OrderStatus
+from .models import Order, OrderItem
+from .providers import pool
+from .providers.uklon import OrderRequestBody, UklonProvider
+from .tracking import TrackingOrder
+
+EARTH_RADIUS_KM = 6371.0
+# the location tracker deletes the mapping once the route is delivered
+MAPPING_TTL = 24 * 60 * 60
+
+
+def distance_km(a: tuple[float, float], b: tuple[float, float]) -> float:
+    """Great-circle distance between two ``(latitude, longitude)`` points"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+@dataclass
+class BatchingSettings:
+    window: float = 30.0
+    max_stops: int = 4
+    max_route_minutes: float = 45.0
+    max_detour_km: float = 3.0
+    speed_kmh: float = 25.0
+    stop_minutes: float = 5.0
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "BatchingSettings":
+        return cls(**{**getattr(settings, "DELIVERY_BATCHING", {}), **overrides})
+
+    def route_minutes(self, stops: list["Stop"]) -> float:
+        """Driving time between the drop-offs plus the time spent at each of them"""
+        driving = sum(
+            distance_km(previous.point, stop.point)
+            for previous, stop in zip(stops, stops[1:])
+        )
+
+        return driving / self.speed_kmh * 60 + len(stops) * self.stop_minutes
+
+
+@dataclass
+class Stop:
+    order_id: int
+    pickup: tuple[int, ...]
+    eta: date
+    address: str
+    point: tuple[float, float] | None
+
+
+def group_stops(stops: list[Stop], config: BatchingSettings) -> list[list[Stop]]:
+    """
+    Greedy nearest-neighbour routes per pickup restaurants and ETA day.
+
+    A route starts at the order that has waited longest and grows with the
+    nearest remaining drop-off within ``max_detour_km`` of its last stop,
+    as long as it keeps to ``max_stops`` and ``max_route_minutes``. Orders
+    without coordinates are delivered alone.
+    """
+    buckets: dict[tuple, list[Stop]] = {}
+    for stop in sorted(stops, key=lambda stop: stop.order_id):
+        buckets.setdefault((stop.pickup, stop.eta), []).append(stop)
+
+    routes = []
+    for remaining in buckets.values():
+        while remaining:
+            route = [remaining.pop(0)]
+
+            while route[0].point is not None and len(route) < config.max_stops:
+                candidates = [
+                    (distance_km(route[-1].point, stop.point), stop)
+                    for stop in remaining
+                    if stop.point is not None
+                ]
+                candidates = [
+                    candidate for candidate in candidates
+                    if candidate[0] <= config.max_detour_km
+                ]
+                if not candidates:
+                    break
+
+                _, nearest = min(candidates, key=lambda candidate: candidate[0])
+                if config.route_minutes(route + [nearest]) > config.max_route_minutes:
+                    break
+
+                route.append(nearest)
+                remaining.remove(nearest)
+
+            routes.append(route)
+
+    return routes
+
+
+class DeliveryDispatcher:
+    """
+    Send cooked orders to Uklon as multi-drop driver orders.
+
+    Every ``window`` seconds the cooked orders are grouped into routes
+    (see ``group_stops``) and each route becomes one Uklon order with one
+    address per stop. Dispatched orders move to DELIVERY_LOOKUP and their
+    Uklon order id is added to the ``deliveries:uklon`` set followed by
+    the location tracker. Orders whose request failed stay COOKED and are
+    retried in the next window, orders without an address are logged and
+    left COOKED. Run a single dispatcher.
+    """
+
+    NAMESPACE = "deliveries"
+
+    def __init__(self, config: BatchingSettings | None = None):
+        self.config = config or BatchingSettings.from_settings()
+        self.provider = UklonProvider()
+        self.cache = CacheService()
+
+    def run(self):
+        while True:
+            started = time.monotonic()
+            self.dispatch()
+            time.sleep(max(self.config.window - (time.monotonic() - started), 0))
+
+    def collect(self) -> list[Stop]:
+        orders = list(
+            Order.objects.filter(
+                status=OrderStatus.COOKED, delivery_provider=self.provider.name
+            ).values("id", "eta", "delivery_address", "latitude", "longitude")
+        )
+
+        unaddressed = [order["id"] for order in orders if not order["delivery_address"]]
+        if unaddressed:
+            print(f"{self.provider.name} can not deliver Orders {unaddressed} without an address")
+            orders = [order for order in orders if order["delivery_address"]]
+
+        pickups: dict[int, set[int]] = {}
+        for order_id, restaurant_id in (
+            OrderItem.objects.filter(order_id__in=[order["id"] for order in orders])
+            .values_list("order_id", "dish__restaurant_id")
+            .distinct()
+        ):
+            pickups.setdefault(order_id, set()).add(restaurant_id)
+
+        return [
+            Stop(
+                order_id=order["id"],
+                pickup=tuple(sorted(pickups.get(order["id"], ()))),
+                eta=order["eta"],
+                address=order["delivery_address"],
+                point=(
+                    (order["latitude"], order["longitude"])
+                    if order["latitude"] is not None and order["longitude"] is not None
+                    else None
+                ),
+            )
+            for order in orders
+        ]
+
+    async def send(self, routes: list[list[Stop]]) -> list:
+        return await asyncio.gather(
+            *(
+                self.provider.create_order(
+                    OrderRequestBody(
+                        addresses=[stop.address for stop in route],
+                        comments=[f"Order {stop.order_id}" for stop in route],
+                    )
+                )
+                for route in routes
+            ),
+            return_exceptions=True,
+        )
+
+    def dispatch(self) -> int:
+        routes = group_stops(self.collect(), self.config)
+        if not routes:
+            return 0
+
+        results = pool.run(self.send(routes))
+        name = self.provider.name
+        dispatched = []
+
+        with self.cache.pipeline(transaction=False) as pipeline:
+            for route, response in zip(routes, results):
+                if isinstance(response, Exception):
+                    print(f"{name} order failed for Orders {[stop.order_id for stop in route]}: {response}")
+                    continue
+
+                for index, stop in enumerate(route):
+                    TrackingOrder.update_delivery(
+                        stop.order_id,
+                        pipeline,
+                        provider=name,
+                        external_id=response.id,
+                        stop=index,
+                        status=self.provider.get_internal_status(response.status),
+                    )
+                    dispatched.append(stop.order_id)
+
+                pipeline.set(
+                    namespace=f"{name}_orders",
+                    key=response.id,
+                    value={"internal_order_ids": [stop.order_id for stop in route]},
+                    ttl=MAPPING_TTL,
+                )
+                pipeline.add_member(namespace=self.NAMESPACE, key=name, member=response.id)
+
+        changed = state.transition(dispatched, OrderStatus.DELIVERY_LOOKUP, source=name)
+        events.publish_events(
+            [events.order_event(order_id, OrderStatus.DELIVERY_LOOKUP) for order_id in changed],
+            self.cache,
+        )
+
+        print(f"Dispatched {len(dispatched)} orders in {len(routes)} {name} routes")
+        return len(dispatched)
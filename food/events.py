@@ -0,0 +1,166 @@
+import asyncio
+import json
+
+import redis
+
+from shared.cache import AsyncCacheService, CacheService
+
+CHANNEL = "orders:events"
+
+
+def channel(order_id: int | str) -> str:
+    return f"{CHANNEL}:{order_id}"
+
+
+def order_event(order_id: int, status: str, restaurant_id: int | str | None = None) -> dict:
+    """Order status change, or the progress of one restaurant when ``restaurant_id`` is set"""
+    event = {"order": int(order_id), "status": status}
+    if restaurant_id is not None:
+        event["restaurant"] = int(restaurant_id)
+
+    return event
+
+
+def publish_events(events: list[dict], cache: CacheService | None = None):
+    """Publish events to the subscribers of their orders in one round-trip"""
+    if not events:
+        return
+
+    with (cache or CacheService()).connection.pipeline(transaction=False) as pipeline:
+        for event in events:
+            pipeline.publish(channel(event["order"]), json.dumps(event))
+        pipeline.execute()
+
+
+async def apublish_event(event: dict, cache: AsyncCacheService | None = None):
+    await (cache or AsyncCacheService()).connection.publish(
+        channel(event["order"]), json.dumps(event)
+    )
+
+
+class OrderEventHub:
+    """
+    Fan order events out to the SSE connections of this process.
+
+    All connections share one Redis pub/sub connection: the hub subscribes
+    to an order channel while at least one client follows that order and
+    hands every message to the per-client queues. An idle client costs a
+    coroutine and an empty queue. When the pub/sub connection fails every
+    queue gets None, so clients reconnect and reload the current state.
+    """
+
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self._queues: dict[str, set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._reader: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+
+    def _bind(self):
+        """Pub/sub connections are bound to the event loop that created them"""
+        loop = asyncio.get_running_loop()
+
+        if self._loop is not loop:
+            self._queues, self._pubsub, self._reader = {}, None, None
+            self._lock = asyncio.Lock()
+            self._loop = loop
+
+    async def subscribe(self, order_id: int) -> asyncio.Queue:
+        self._bind()
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        name = channel(order_id)
+
+        async with self._lock:
+            if self._pubsub is None:
+                self._pubsub = AsyncCacheService().connection.pubsub(
+                    ignore_subscribe_messages=True
+                )
+
+            if name not in self._queues:
+                self._queues[name] = set()
+                await self._pubsub.subscribe(name)
+
+            self._queues[name].add(queue)
+
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+
+        return queue
+
+    async def unsubscribe(self, order_id: int, queue: asyncio.Queue):
+        name = channel(order_id)
+
+        async with self._lock:
+            queues = self._queues.get(name, set())
+            queues.discard(queue)
+
+            if not queues and name in self._queues:
+                del self._queues[name]
+
+                if self._pubsub is not None:
+                    try:
+                        await self._pubsub.unsubscribe(name)
+                    except redis.RedisError as error:
+                        print(f"Order events unsubscribe failed: {error}")
+
+    async def _read(self):
+        try:
+            while self._queues:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                if message is None:
+                    continue
+
+                event = json.loads(message["data"])
+                for queue in list(self._queues.get(message["channel"].decode(), ())):
+                    if queue.full():
+                        # a stuck client only loses its own events
+                        continue
+                    queue.put_nowait(event)
+        except redis.RedisError as error:
+            print(f"Order events listener failed: {error}")
+
+            async with self._lock:
+                for queues in self._queues.values():
+                    for queue in queues:
+                        if queue.full():
+                            queue.get_nowait()
+                        queue.put_nowait(None)
+
+                pubsub, self._queues, self._pubsub = self._pubsub, {}, None
+
+            try:
+                await pubsub.aclose()
+            except redis.RedisError:
+                pass
+
+
+def sse(event: dict, name: str = "status") -> str:
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream(order_id: int, state: dict, queue: asyncio.Queue, keepalive: float = 15.0):
+    """Server-sent events of one client: the current ``state``, then every change"""
+    try:
+        yield sse(state, name="state")
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except TimeoutError:
+                # keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+
+            if event is None:
+                return
+
+            yield sse(event)
+    finally:
+        await hub.unsubscribe(order_id, queue)
+
+
+hub = OrderEventHub()
@@ -0,0 +1,94 @@
+import csv
+import itertools
+from typing import AsyncIterator, Iterator
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, QuerySet
+
+from .models import Order, OrderItem
+
+CSV_HEADER = ["order_id", "status", "user_id", "eta", "total", "delivery_provider", "dish_id", "quantity"]
+
+
+class Echo:
+    """File-like object that hands written rows back to ``csv.writer``"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iterate_orders(orders: QuerySet[Order], chunk_size: int = 2000) -> Iterator[Order]:
+    """
+    Stream orders with their items in constant memory.
+
+    Rows are read through a server-side cursor ``chunk_size`` at a time,
+    and items are prefetched with one query per chunk.
+    """
+    return (
+        orders.order_by("id")
+        .prefetch_related(
+            Prefetch("items", queryset=OrderItem.objects.only("order_id", "dish_id", "quantity"))
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def export_ndjson(orders: QuerySet[Order]) -> Iterator[str]:
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+
+    for order in iterate_orders(orders):
+        yield encoder.encode(
+            {
+                "id": order.pk,
+                "status": order.status,
+                "user": order.user_id,
+                "eta": order.eta,
+                "total": order.total,
+                "delivery_provider": order.delivery_provider,
+                "items": [
+                    {"dish": item.dish_id, "quantity": item.quantity}
+                    for item in order.items.all()
+                ],
+            }
+        ) + "\n"
+
+
+def export_csv(orders: QuerySet[Order]) -> Iterator[str]:
+    """One row per order item, orders without items get one row with empty item columns"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+
+    for order in iterate_orders(orders):
+        row = [order.pk, order.status, order.user_id, order.eta, order.total, order.delivery_provider]
+        items = order.items.all()
+
+        if not items:
+            yield writer.writerow(row + ["", ""])
+
+        for item in items:
+            yield writer.writerow(row + [item.dish_id, item.quantity])
+
+
+async def aiterate(rows: Iterator[str], chunk_size: int = 500) -> AsyncIterator[str]:
+    """
+    Serve a sync export to an ASGI server ``chunk_size`` rows at a time.
+
+    Given a sync iterator Django's ASGI handler reads the whole export into
+    a list first. Chunks are read with ``sync_to_async`` on the request's
+    thread, where the export's server-side cursor lives.
+    """
+    next_chunk = sync_to_async(lambda: list(itertools.islice(rows, chunk_size)))
+
+    try:
+        while chunk := await next_chunk():
+            yield "".join(chunk)
+    finally:
+        # a client that went away must not keep the cursor open
+        await sync_to_async(rows.close)()
+
+
+EXPORTS = {
+    "ndjson": (export_ndjson, "application/x-ndjson"),
+    "csv": (export_csv, "text/csv"),
+}
@@ -0,0 +1,162 @@
+import codecs
+import csv
+import uuid
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+from config import celery_app
+from shared.cache import CacheService
+from . import outbox
+from .menu import menu
+from .models import Dish, Restaurant
+from .restaurants import restaurants
+
+CHUNK_SIZE = 5000
+# rows with errors are counted, only the first ones are reported
+MAX_ERRORS = 50
+# queued uploads are kept in Redis, which the web and worker processes share
+UPLOADS = "dish_import_uploads"
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass
+class DishImportReport:
+    status: str = "running"
+    rows: int = 0
+    imported: int = 0
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def error(self, line: int, message: str):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"Line {line}: {message}")
+
+
+def read_dishes(lines: Iterable[str], report: DishImportReport) -> Iterator[Dish]:
+    """
+    Parse ``name,price,restaurant`` rows into unsaved dishes.
+
+    The example menu spells the column ``restaraunt``, both spellings are
+    accepted. Restaurants are resolved by name from the in-memory registry.
+    """
+    reader = csv.DictReader(lines)
+
+    for row in reader:
+        report.rows += 1
+        name = (row.get("name") or "").strip()
+        restaurant_name = (row.get("restaurant") or row.get("restaraunt") or "").strip()
+
+        try:
+            price = int(row.get("price") or "")
+            restaurant = restaurants.get(name=restaurant_name)
+        except ValueError:
+            report.error(reader.line_num, f"invalid price {row.get('price')!r}")
+            continue
+        except Restaurant.DoesNotExist:
+            report.error(reader.line_num, f"unknown restaurant {restaurant_name!r}")
+            continue
+
+        if not name:
+            report.error(reader.line_num, "empty dish name")
+            continue
+
+        yield Dish(name=name, price=price, restaurant=restaurant)
+
+
+def import_dishes(
+    file: Iterable[bytes],
+    progress: Callable[[DishImportReport], None] | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> DishImportReport:
+    """
+    Upsert dishes from a CSV file in bounded memory.
+
+    Rows are streamed and written ``chunk_size`` at a time with one
+    ``INSERT ... ON CONFLICT (restaurant_id, name) DO UPDATE`` statement
+    per chunk. Bulk writes skip model signals, so the menu snapshot is
+    rebuilt once at the end.
+    """
+    report = DishImportReport()
+    dishes = read_dishes(codecs.iterdecode(file, "utf-8-sig"), report)
+
+    while chunk := list(islice(dishes, chunk_size)):
+        # one statement can not update the same row twice, the last row wins
+        unique = {(dish.restaurant_id, dish.name): dish for dish in chunk}
+        Dish.objects.bulk_create(
+            unique.values(),
+            update_conflicts=True,
+            unique_fields=["restaurant", "name"],
+            update_fields=["price"],
+        )
+        report.imported += len(unique)
+
+        if progress is not None:
+            progress(report)
+
+    report.status = "done"
+    menu.rebuild()
+
+    return report
+
+
+def save_progress(job_id: str, report: DishImportReport, cache: CacheService | None = None):
+    (cache or CacheService()).set(
+        namespace="dish_imports", key=job_id, value=asdict(report), ttl=24 * 60 * 60
+    )
+
+
+def get_progress(job_id: str) -> dict | None:
+    return CacheService().get(namespace="dish_imports", key=job_id)
+
+
+def join_lines(lines: Iterable[bytes], size: int = UPLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+    """Whole lines, joined into chunks of about ``size`` bytes"""
+    chunk, length = [], 0
+
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+
+        if length >= size:
+            yield b"".join(chunk)
+            chunk, length = [], 0
+
+    if chunk:
+        yield b"".join(chunk)
+
+
+def schedule_import(upload) -> str:
+    """Store an uploaded file for ``import_dishes_file`` and return the job id"""
+    job_id = uuid.uuid4().hex
+    cache = CacheService()
+
+    cache.append_chunks(UPLOADS, job_id, join_lines(upload), ttl=24 * 60 * 60)
+    save_progress(job_id, DishImportReport(status="queued"), cache)
+    outbox.enqueue(import_dishes_file, {"job": job_id})
+
+    return job_id
+
+
+@celery_app.task(queue="default")
+def import_dishes_file(message: dict):
+    job_id = message["job"]
+    cache = CacheService()
+    # chunks end on a line boundary, see join_lines
+    lines = (
+        line
+        for chunk in cache.chunks(UPLOADS, job_id)
+        for line in chunk.splitlines(keepends=True)
+    )
+
+    try:
+        report = import_dishes(lines, lambda report: save_progress(job_id, report, cache))
+    except Exception as error:
+        save_progress(job_id, DishImportReport(status="failed", errors=[str(error)]), cache)
+        raise
+    finally:
+        cache.delete(UPLOADS, job_id)
+
+    save_progress(job_id, report, cache)
+    print(f"Dish import {job_id} finished: {report.imported} imported, {report.skipped} skipped")
@@ -0,0 +1,190 @@
+import asyncio
+import struct
+import time
+
+import httpx
+
+from shared.cache import AsyncCacheService, CacheService
+from . import events, state
+from .delivery import DeliveryDispatcher
+from .enums import OrderStatus
+from .providers.uklon import UklonProvider
+from .tracking import TrackingOrder
+
+NAMESPACE = "locations"
+# latitude, longitude, unix time: 12 bytes per history entry
+POINT = struct.Struct("<ffI")
+HISTORY_SIZE = 100
+# GEOADD rejects latitudes beyond the poles of the Web Mercator projection
+MAX_LATITUDE = 85.05112878
+# tracks and delivery mappings are deleted on DELIVERED, this only bounds
+# the keys of deliveries that never get there
+TRACK_TTL = 24 * 60 * 60
+
+
+def is_valid_point(latitude: float, longitude: float) -> bool:
+    """Whether a Redis GEO set can store the point, NaN never can"""
+    return -MAX_LATITUDE <= latitude <= MAX_LATITUDE and -180 <= longitude <= 180
+
+
+def where_is(order_id: int, history: int = 20, cache: CacheService | None = None) -> dict | None:
+    """Latest driver position of an order and its recent track, newest first"""
+    cache = cache or CacheService()
+    position = cache.get_positions(NAMESPACE, "current", [str(order_id)]).get(str(order_id))
+
+    if position is None:
+        return None
+
+    track = [POINT.unpack(entry) for entry in cache.recent(NAMESPACE, str(order_id), history)]
+
+    return {
+        "order": order_id,
+        "location": position,
+        "track": [[latitude, longitude, at] for latitude, longitude, at in track],
+    }
+
+
+def orders_near(
+    latitude: float, longitude: float, radius_km: float, count: int = 50, cache: CacheService | None = None
+) -> list[dict]:
+    """Orders whose driver is within ``radius_km`` of the point, nearest first"""
+    results = (cache or CacheService()).search_positions(
+        NAMESPACE, "current", latitude, longitude, radius_km, count
+    )
+
+    return [
+        {"order": int(member), "distance_km": round(distance, 3), "location": position}
+        for member, distance, position in results
+    ]
+
+
+class LocationTracker:
+    """
+    Follow the drivers of every active Uklon delivery.
+
+    Each tick polls all deliveries of the ``deliveries:uklon`` set
+    concurrently and writes the positions of all their orders in one
+    pipeline: the ``locations:current`` GEO set holds the latest position
+    of every order, ``locations:<order_id>`` a capped list of packed
+    recent points. Postgres is only touched when a delivery status
+    changes. Delivered orders leave the GEO set, and their tracks and
+    ``uklon_orders`` mapping are deleted.
+    """
+
+    def __init__(self, interval: float = 2.0, concurrency: int = 200):
+        self.provider = UklonProvider()
+        self.interval = interval
+        self.concurrency = concurrency
+        self.cache: AsyncCacheService | None = None
+        self.statuses: dict[str, OrderStatus] = {}
+
+    async def run(self):
+        # async connections are bound to the loop, so the client is made here
+        self.cache = AsyncCacheService()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        while True:
+            started = asyncio.get_running_loop().time()
+            try:
+                await self.tick(semaphore)
+            except Exception as error:
+                print(f"{self.provider.name} location tick failed: {error!r}")
+            elapsed = asyncio.get_running_loop().time() - started
+            await asyncio.sleep(max(self.interval - elapsed, 0))
+
+    async def poll(self, semaphore: asyncio.Semaphore, external_id: str):
+        async with semaphore:
+            try:
+                return await self.provider.get_order(external_id)
+            except (httpx.HTTPError, KeyError, TypeError, ValueError) as error:
+                print(f"{self.provider.name} polling failed for {external_id}: {error}")
+                return None
+
+    async def tick(self, semaphore: asyncio.Semaphore):
+        name = self.provider.name
+        external_ids = list(
+            await self.cache.members(namespace=DeliveryDispatcher.NAMESPACE, key=name)
+        )
+        if not external_ids:
+            return
+
+        responses = await asyncio.gather(
+            *(self.poll(semaphore, external_id) for external_id in external_ids)
+        )
+        mappings = await self.cache.get_many(f"{name}_orders", external_ids)
+        now = int(time.time())
+
+        positions, changes, delivered = {}, {}, []
+        # the mapping expired, nothing is left to update for the delivery
+        orphaned = [external_id for external_id in external_ids if external_id not in mappings]
+
+        async with self.cache.pipeline(transaction=False) as pipeline:
+            for external_id, response in zip(external_ids, responses):
+                mapping = mappings.get(external_id)
+                if response is None or mapping is None:
+                    continue
+
+                latitude, longitude = response.location
+                status = self.provider.get_internal_status(response.status)
+
+                if is_valid_point(latitude, longitude):
+                    for order_id in mapping["internal_order_ids"]:
+                        positions[str(order_id)] = (latitude, longitude)
+                        await pipeline.push_recent(
+                            NAMESPACE,
+                            str(order_id),
+                            POINT.pack(latitude, longitude, now),
+                            HISTORY_SIZE,
+                            ttl=TRACK_TTL,
+                        )
+                else:
+                    # GEOADD would fail the whole pipeline, every delivery included
+                    print(f"{name} reported invalid location {response.location} for {external_id}")
+
+                if self.statuses.get(external_id) != status:
+                    self.statuses[external_id] = status
+                    changes[external_id] = (status, mapping["internal_order_ids"])
+
+                    for order_id in mapping["internal_order_ids"]:
+                        await TrackingOrder.aupdate_delivery(order_id, pipeline, status=status)
+
+                if status == OrderStatus.DELIVERED:
+                    delivered.append((external_id, mapping["internal_order_ids"]))
+
+            await pipeline.add_positions(NAMESPACE, "current", positions)
+
+            for external_id in orphaned:
+                await pipeline.remove_member(DeliveryDispatcher.NAMESPACE, name, external_id)
+                self.statuses.pop(external_id, None)
+
+        await self.apply_statuses(changes)
+
+        if delivered:
+            async with self.cache.pipeline(transaction=False) as pipeline:
+                for external_id, order_ids in delivered:
+                    members = [str(order_id) for order_id in order_ids]
+
+                    await pipeline.remove_member(DeliveryDispatcher.NAMESPACE, name, external_id)
+                    await pipeline.remove_positions(NAMESPACE, "current", members)
+                    await pipeline.delete_many(NAMESPACE, members)
+                    await pipeline.delete(f"{name}_orders", external_id)
+                    self.statuses.pop(external_id, None)
+
+            print(f"{len(delivered)} {name} deliveries are finished")
+
+    async def apply_statuses(self, changes: dict[str, tuple[OrderStatus, list[int]]]):
+        """Move orders to the new delivery statuses, a skipped DELIVERY step is applied too"""
+        name = self.provider.name
+        targets = {OrderStatus.DELIVERY: set(), OrderStatus.DELIVERED: set()}
+
+        for status, order_ids in changes.values():
+            if status in (OrderStatus.DELIVERY, OrderStatus.DELIVERED):
+                targets[OrderStatus.DELIVERY].update(order_ids)
+            if status == OrderStatus.DELIVERED:
+                targets[OrderStatus.DELIVERED].update(order_ids)
+
+        for status, order_ids in targets.items():
+            changed = await state.atransition(order_ids, status, source=name)
+
+            for order_id in changed:
+                await events.apublish_event(events.order_event(order_id, status), self.cache)
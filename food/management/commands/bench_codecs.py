@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from food.enums import OrderStatus
+from shared.codecs import CODECS, COMPRESSORS, ValueCodec
+
+
+def tracking_payload(restaurants: int, items: int, history: int) -> dict:
+    """Request bodies and per-restaurant status history of one order"""
+    return {
+        "restaurants": {
+            str(restaurant_id): {
+                "external_id": f"3f1c2a9e-7b7d-4c1e-9a53-{restaurant_id:012d}",
+                "status": OrderStatus.COOKING,
+                "request_body": [
+                    [restaurant_id * 1000 + index, f"dish number {index}", index % 5 + 1]
+                    for index in range(items)
+                ],
+                "history": [
+                    [1_760_000_000 + step, OrderStatus.NOT_STARTED]
+                    for step in range(history)
+                ],
+            }
+            for restaurant_id in range(restaurants)
+        },
+        "delivery": {"provider": "uklon", "external_id": None},
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare installed cache codecs on realistic tracking payloads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument("--restaurants", type=int, default=3)
+        parser.add_argument("--items", type=int, default=20)
+        parser.add_argument("--history", type=int, default=10)
+
+    def handle(self, *args, **options):
+        payload = tracking_payload(
+            options["restaurants"], options["items"], options["history"]
+        )
+        iterations = options["iterations"]
+
+        self.stdout.write(
+            f"{'codec':<10}{'compression':<13}{'bytes':>8}{'encode/s':>12}{'decode/s':>12}"
+        )
+
+        for codec in CODECS.values():
+            for compressor in COMPRESSORS.values():
+                value_codec = ValueCodec(codec, compressor, threshold=0)
+
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    data = value_codec.encode(payload)
+                encoded = time.perf_counter() - started
+
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    value_codec.decode(data)
+                decoded = time.perf_counter() - started
+
+                self.stdout.write(
+                    f"{codec.name:<10}{compressor.name:<13}{len(data):>8}"
+                    f"{iterations / encoded:>12.0f}{iterations / decoded:>12.0f}"
+                )
@@ -0,0 +1,100 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from food.enums import OrderStatus
+from food.tracking import TrackingOrder
+from shared.cache import CacheService
+
+STATUSES = [OrderStatus.NOT_STARTED, OrderStatus.COOKING, OrderStatus.COOKED]
+
+
+class Command(BaseCommand):
+    help = "Benchmark tracking status updates: whole-blob rewrite vs hash fields"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--updates", type=int, default=2000, help="updates per writer")
+        parser.add_argument("--restaurants", type=int, default=4)
+        parser.add_argument("--order-id", type=int, default=999_999_999)
+
+    def handle(self, *args, **options):
+        cache = CacheService()
+        order_id = options["order_id"]
+        restaurants = [str(index) for index in range(options["restaurants"])]
+        request_body = [[index, f"dish {index}", 1] for index in range(20)]
+
+        def initial_state() -> TrackingOrder:
+            return TrackingOrder(
+                restaurants={
+                    restaurant_id: {
+                        "external_id": f"external-{restaurant_id}",
+                        "status": OrderStatus.NOT_STARTED,
+                        "request_body": request_body,
+                        "updates": 0,
+                    }
+                    for restaurant_id in restaurants
+                }
+            )
+
+        def blob_update(restaurant_id: str):
+            payload = json.loads(cache.connection.get(f"bench:blob:{order_id}"))
+            entry = payload["restaurants"][restaurant_id]
+            entry["status"] = random.choice(STATUSES)
+            entry["updates"] += 1
+            cache.connection.set(f"bench:blob:{order_id}", json.dumps(payload))
+
+        def hash_update(restaurant_id: str):
+            TrackingOrder.update_restaurant(
+                order_id, restaurant_id, cache, status=random.choice(STATUSES)
+            )
+            cache.connection.hincrby(
+                f"{TrackingOrder.NAMESPACE}:{order_id}", f"{restaurant_id}:updates"
+            )
+
+        def hash_compare_and_set(restaurant_id: str):
+            current = cache.get_field(
+                TrackingOrder.NAMESPACE, str(order_id), f"{restaurant_id}:status"
+            )
+            TrackingOrder.compare_and_set_status(
+                order_id, restaurant_id, current, random.choice(STATUSES), cache
+            )
+
+        def run(name: str, update) -> float:
+            total = options["writers"] * options["updates"]
+
+            def writer(_):
+                for _ in range(options["updates"]):
+                    update(random.choice(restaurants))
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["writers"]) as executor:
+                list(executor.map(writer, range(options["writers"])))
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(f"{name:<16} {total / elapsed:>10.0f} updates/sec")
+            return total
+
+        # whole-blob read-modify-write, the previous storage layout
+        cache.connection.set(
+            f"bench:blob:{order_id}",
+            json.dumps({"restaurants": initial_state().restaurants, "delivery": {}}),
+        )
+        expected = run("blob get/set", blob_update)
+        stored = json.loads(cache.connection.get(f"bench:blob:{order_id}"))
+        lost = expected - sum(entry["updates"] for entry in stored["restaurants"].values())
+        self.stdout.write(f"{'':<16} lost updates: {lost}")
+        cache.connection.delete(f"bench:blob:{order_id}")
+
+        cache.delete(TrackingOrder.NAMESPACE, str(order_id))
+        initial_state().save(order_id, cache)
+        expected = run("hash fields", hash_update)
+        stored = TrackingOrder.load(order_id, cache)
+        lost = expected - sum(entry["updates"] for entry in stored.restaurants.values())
+        self.stdout.write(f"{'':<16} lost updates: {lost}")
+
+        run("hash CAS", hash_compare_and_set)
+        cache.delete(TrackingOrder.NAMESPACE, str(order_id))
@@ -0,0 +1,46 @@
+import socket
+
+from django.core.management.base import BaseCommand
+
+from food.webhooks import KFCEventConsumer
+
+
+class Command(BaseCommand):
+    help = "Apply KFC webhook events from the webhooks:kfc stream in batches"
+
+    def add_arguments(self, parser):
+        # a restarted consumer keeps its name and replays its own pending events
+        parser.add_argument("--consumer", default=socket.gethostname())
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--block", type=int, default=1000, help="milliseconds")
+        parser.add_argument(
+            "--claim-idle",
+            type=int,
+            default=60_000,
+            help="milliseconds before unacknowledged events of other consumers are claimed",
+        )
+        parser.add_argument(
+            "--retry-delay",
+            type=float,
+            default=1.0,
+            help="seconds between replays of events waiting for their order",
+        )
+        parser.add_argument(
+            "--mapping-wait",
+            type=int,
+            default=300_000,
+            help="milliseconds an event waits for its order before it is dropped",
+        )
+
+    def handle(self, *args, **options):
+        consumer = KFCEventConsumer(
+            consumer=options["consumer"],
+            batch_size=options["batch_size"],
+            block=options["block"],
+            claim_idle=options["claim_idle"],
+            retry_delay=options["retry_delay"],
+            mapping_wait=options["mapping_wait"],
+        )
+
+        self.stdout.write(f"Consuming KFC events as {options['consumer']}")
+        consumer.run()
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from food.delivery import BatchingSettings, DeliveryDispatcher
+
+
+class Command(BaseCommand):
+    help = "Batch cooked orders into multi-drop Uklon deliveries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--window", type=float, help="seconds")
+        parser.add_argument("--max-stops", type=int)
+        parser.add_argument("--max-route-minutes", type=float)
+
+    def handle(self, *args, **options):
+        overrides = {
+            name: options[name]
+            for name in ("window", "max_stops", "max_route_minutes")
+            if options[name] is not None
+        }
+        dispatcher = DeliveryDispatcher(BatchingSettings.from_settings(**overrides))
+
+        self.stdout.write(f"Dispatching deliveries every {dispatcher.config.window}s")
+        dispatcher.run()
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from food import rollups
+
+
+class Command(BaseCommand):
+    help = "Fold pending order_rollup_deltas into the order_rollups counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--interval", type=float, default=1.0, help="seconds")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Folding order rollup deltas")
+
+        while True:
+            # a full batch means more deltas are probably waiting
+            if rollups.fold(options["batch_size"]) < options["batch_size"]:
+                time.sleep(options["interval"])
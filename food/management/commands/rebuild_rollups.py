@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from food import rollups
+
+
+class Command(BaseCommand):
+    help = "Recount the order_rollups table from orders and order_items, pending deltas included"
+
+    def handle(self, *args, **options):
+        created = rollups.rebuild()
+
+        self.stdout.write(f"Rebuilt {created} order rollups")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from food.outbox import OutboxRelay
+
+
+class Command(BaseCommand):
+    help = "Publish committed outbox messages to the Celery broker"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--interval", type=float, default=0.5, help="seconds")
+
+    def handle(self, *args, **options):
+        relay = OutboxRelay(batch_size=options["batch_size"], interval=options["interval"])
+
+        self.stdout.write("Relaying outbox messages")
+        relay.run()
@@ -0,0 +1,21 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from food.locations import LocationTracker
+
+
+class Command(BaseCommand):
+    help = "Poll driver locations and statuses of active Uklon deliveries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=2.0, help="seconds")
+        parser.add_argument("--concurrency", type=int, default=200)
+
+    def handle(self, *args, **options):
+        tracker = LocationTracker(
+            interval=options["interval"], concurrency=options["concurrency"]
+        )
+
+        self.stdout.write("Tracking Uklon driver locations")
+        asyncio.run(tracker.run())
@@ -0,0 +1,30 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from food.tracking import OrderTracker
+
+
+class Command(BaseCommand):
+    help = "Track in-flight orders of a polling provider from a single event loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", default="silpo")
+        parser.add_argument("--interval", type=float, default=1.0)
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument("--shards", type=int, default=1)
+        parser.add_argument("--shard", type=int, default=0)
+
+    def handle(self, *args, **options):
+        tracker = OrderTracker(
+            provider=options["provider"],
+            interval=options["interval"],
+            concurrency=options["concurrency"],
+            shards=options["shards"],
+            shard=options["shard"],
+        )
+
+        self.stdout.write(
+            f"Tracking {options['provider']} orders (shard {options['shard']}/{options['shards']})"
+        )
+        asyncio.run(tracker.run())
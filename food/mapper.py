@@ -1,15 +0,0 @@
-from food.enums import OrderStatus
-from .providers import silpo, kfc
-
-RESTAURANT_EXTERNAL_TO_INTERNAL: dict[str, dict[str, OrderStatus]] = {
-    "silpo": {
-        silpo.OrderStatus.NOT_STARTED: OrderStatus.NOT_STARTED,
-        silpo.OrderStatus.COOKING: OrderStatus.COOKING,
-        silpo.OrderStatus.COOKED: OrderStatus.COOKED,
-    },
-    "kfc": {
-        kfc.OrderStatus.NOT_STARTED: OrderStatus.NOT_STARTED,
-        kfc.OrderStatus.COOKING: OrderStatus.COOKING,
-        kfc.OrderStatus.COOKED: OrderStatus.COOKED,
-    },
-}
\ No newline at end of file
@@ -0,0 +1,203 @@
+import gzip
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from shared.cache import CacheService
+from shared.invalidation import bus
+from .models import Dish, Restaurant
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# KEYS[1] snapshot hash, ARGV: version, then field/value pairs.
+# Snapshots are assembled concurrently, an older one must not win.
+SET_IF_NEWER = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'version') or '-1')
+if current >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], unpack(ARGV, 2))
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class MenuSnapshot:
+    """Pre-encoded ``GET /food/dishes/`` body, its ETag and compressed variants"""
+
+    version: int
+    etag: str
+    body: bytes
+    encodings: dict[str, bytes]
+
+    @classmethod
+    def build(cls, version: int, body: bytes) -> "MenuSnapshot":
+        encodings = {"gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            encodings["br"] = brotli.compress(body)
+
+        return cls(
+            version=version,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            body=body,
+            encodings=encodings,
+        )
+
+    @classmethod
+    def from_fields(cls, fields: dict[bytes, bytes]) -> "MenuSnapshot":
+        return cls(
+            version=int(fields.pop(b"version")),
+            etag=fields.pop(b"etag").decode(),
+            body=fields.pop(b"body"),
+            encodings={name.decode(): value for name, value in fields.items()},
+        )
+
+    def to_fields(self) -> dict[str, bytes | str]:
+        return {"etag": self.etag, "body": self.body, **self.encodings}
+
+
+class Menu:
+    """
+    Restaurants with their dishes, rendered once and shared by every process.
+
+    Each restaurant is rendered into its own JSON fragment in the
+    ``menu:fragments`` hash. A change re-renders only the affected
+    restaurant and joins the fragments into the snapshot, so the
+    endpoint never serializes anything itself. Processes keep the
+    snapshot in memory until the ``menu:invalidate`` message arrives.
+    """
+
+    CHANNEL = "menu:invalidate"
+    NAMESPACE = "menu"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: MenuSnapshot | None = None
+        self._pid: int | None = None
+        # restaurants changed by the transactions of each thread
+        self._pending = threading.local()
+
+    @staticmethod
+    def render(restaurants: list[Restaurant], dishes: list[dict]) -> dict[str, bytes]:
+        """JSON fragment per restaurant id: the restaurant fields and its dishes"""
+        renderer = JSONRenderer()
+        menu = {
+            restaurant.pk: {
+                "id": restaurant.pk,
+                "dishes": [],
+                "name": restaurant.name,
+                "address": restaurant.address,
+            }
+            for restaurant in restaurants
+        }
+
+        for dish in dishes:
+            restaurant_id = dish.pop("restaurant_id")
+            if restaurant_id in menu:
+                menu[restaurant_id]["dishes"].append(dish)
+
+        return {str(pk): renderer.render(data) for pk, data in menu.items()}
+
+    def get(self) -> MenuSnapshot:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._snapshot = None
+                self._pid = os.getpid()
+
+            if self._snapshot is not None:
+                return self._snapshot
+
+        subscribed = bus.subscribe(self.CHANNEL, lambda _: self.invalidate())
+        fields = CacheService().connection.hgetall(f"{self.NAMESPACE}:snapshot")
+        snapshot = MenuSnapshot.from_fields(fields) if fields else self.rebuild()
+
+        if subscribed:
+            with self._lock:
+                self._snapshot = snapshot
+
+        return snapshot
+
+    def rebuild_on_commit(self, restaurant_id: int):
+        """
+        Re-render a restaurant once the current transaction commits.
+
+        Cascade deletes and bulk edits call this for every row, each
+        restaurant is still rebuilt only once per transaction.
+        """
+        if not hasattr(self._pending, "restaurants"):
+            self._pending.restaurants = set()
+
+        self._pending.restaurants.add(restaurant_id)
+        transaction.on_commit(self._rebuild_pending)
+
+    def _rebuild_pending(self):
+        # the first callback of a transaction rebuilds everything, the rest find
+        # nothing left; ids of rolled back transactions wait for the next commit
+        pending: set[int] = getattr(self._pending, "restaurants", set())
+
+        while pending:
+            self.rebuild(pending.pop())
+
+    def rebuild(self, restaurant_id: int | None = None) -> MenuSnapshot:
+        """
+        Re-render one restaurant, or all of them, and publish a new snapshot.
+
+        Without the ``menu:fragments`` hash (cold or flushed Redis) a single
+        restaurant can not be joined with the others, so everything is
+        rebuilt instead.
+        """
+        connection = CacheService().connection
+        key = f"{self.NAMESPACE}:fragments"
+
+        if restaurant_id is not None and not connection.exists(key):
+            restaurant_id = None
+
+        restaurants = Restaurant.objects.order_by("id")
+        dishes = Dish.objects.order_by("id").values("id", "name", "price", "restaurant_id")
+
+        if restaurant_id is not None:
+            restaurants = restaurants.filter(id=restaurant_id)
+            dishes = dishes.filter(restaurant_id=restaurant_id)
+
+        fragments = self.render(list(restaurants), list(dishes))
+
+        with connection.pipeline(transaction=True) as pipeline:
+            if restaurant_id is None:
+                pipeline.delete(key)
+            elif str(restaurant_id) not in fragments:
+                pipeline.hdel(key, str(restaurant_id))
+
+            if fragments:
+                pipeline.hset(key, mapping=fragments)
+            pipeline.incr(f"{self.NAMESPACE}:version")
+            pipeline.hgetall(key)
+            *_, version, stored = pipeline.execute()
+
+        body = b"[" + b",".join(
+            fragment for _, fragment in sorted(stored.items(), key=lambda item: int(item[0]))
+        ) + b"]"
+        snapshot = MenuSnapshot.build(version, body)
+
+        fields = [value for pair in snapshot.to_fields().items() for value in pair]
+        connection.register_script(SET_IF_NEWER)(
+            keys=[f"{self.NAMESPACE}:snapshot"], args=[version, *fields]
+        )
+
+        self.invalidate()
+        bus.publish(self.CHANNEL)
+
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+
+menu = Menu()
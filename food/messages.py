@@ -0,0 +1,56 @@
+from dataclasses import dataclass, field
+
+# Bump on every incompatible change of the wire format and keep reading
+# the previous version until the queues are drained.
+MESSAGE_VERSION = 1
+
+
+@dataclass
+class SubOrder:
+    """
+    Items of a single restaurant.
+
+    Items are ``[dish_id, dish_name, quantity]`` triples: enough for the
+    provider request body without touching the database in the worker.
+    """
+
+    restaurant: str
+    items: list[list] = field(default_factory=list)
+
+    def dish_quantities(self) -> list[tuple[str, int]]:
+        return [(dish, quantity) for _, dish, quantity in self.items]
+
+
+@dataclass
+class PlaceOrderMessage:
+    """JSON/msgpack safe payload of ``place_order``"""
+
+    order_id: int
+    sub_orders: dict[str, SubOrder] = field(default_factory=dict)
+    version: int = MESSAGE_VERSION
+
+    def to_dict(self) -> dict:
+        return {
+            "v": self.version,
+            "order": self.order_id,
+            "restaurants": {
+                restaurant_id: [sub_order.restaurant, sub_order.items]
+                for restaurant_id, sub_order in self.sub_orders.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "PlaceOrderMessage":
+        version = payload.get("v")
+
+        if version != MESSAGE_VERSION:
+            raise ValueError(f"Unsupported place_order message version: {version}")
+
+        return cls(
+            order_id=int(payload["order"]),
+            sub_orders={
+                str(restaurant_id): SubOrder(restaurant=name, items=items)
+                for restaurant_id, (name, items) in payload["restaurants"].items()
+            },
+            version=version,
+        )
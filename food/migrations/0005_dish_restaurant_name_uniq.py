@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0004_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='dish',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'name'), name='dishes_restaurant_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 13:40
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN/pg_trgm exist only on Postgres, SQLite test runs use a plain scan
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS dishes_name_trgm_idx ON dishes USING gin (name gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("DROP INDEX IF EXISTS dishes_name_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0005_dish_restaurant_name_uniq'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-18 14:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0006_dish_name_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('not_started', 'Not started'), ('cooking_rejected', 'Cooking rejected'), ('cooking', 'Cooking'), ('cooked', 'Cooked'), ('delivery_lookup', 'Delivery lookup'), ('delivery', 'Delivery'), ('delivered', 'Delivered'), ('not_delivered', 'Not delivered'), ('failed', 'Failed'), ('cancelled_by_customer', 'Cancelled by customer'), ('cancelled_by_manager', 'Cancelled by manager'), ('cancelled_by_admin', 'Cancelled by admin'), ('cancelled_by_restaurant', 'Cancelled by restaurant'), ('cancelled_by_driver', 'Cancelled by driver')], max_length=50, null=True)),
+                ('to_status', models.CharField(choices=[('not_started', 'Not started'), ('cooking_rejected', 'Cooking rejected'), ('cooking', 'Cooking'), ('cooked', 'Cooked'), ('delivery_lookup', 'Delivery lookup'), ('delivery', 'Delivery'), ('delivered', 'Delivered'), ('not_delivered', 'Not delivered'), ('failed', 'Failed'), ('cancelled_by_customer', 'Cancelled by customer'), ('cancelled_by_manager', 'Cancelled by manager'), ('cancelled_by_admin', 'Cancelled by admin'), ('cancelled_by_restaurant', 'Cancelled by restaurant'), ('cancelled_by_driver', 'Cancelled by driver')], max_length=50)),
+                ('source', models.CharField(blank=True, default='', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='food.order')),
+            ],
+            options={
+                'db_table': 'order_status_history',
+                'indexes': [models.Index(fields=['order', 'created_at'], name='order_history_order_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0007_orderstatushistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('not_started', 'Not started'), ('cooking_rejected', 'Cooking rejected'), ('cooking', 'Cooking'), ('cooked', 'Cooked'), ('delivery_lookup', 'Delivery lookup'), ('delivery', 'Delivery'), ('delivered', 'Delivered'), ('not_delivered', 'Not delivered'), ('failed', 'Failed'), ('cancelled_by_customer', 'Cancelled by customer'), ('cancelled_by_manager', 'Cancelled by manager'), ('cancelled_by_admin', 'Cancelled by admin'), ('cancelled_by_restaurant', 'Cancelled by restaurant'), ('cancelled_by_driver', 'Cancelled by driver')], max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='food.restaurant')),
+            ],
+            options={
+                'db_table': 'order_rollups',
+                'constraints': [models.UniqueConstraint(fields=('day', 'status', 'restaurant'), name='order_rollups_key_uniq')],
+            },
+        ),
+    ]
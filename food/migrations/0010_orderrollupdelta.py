@@ -0,0 +1,27 @@
+# Generated by Django 6.0.9 on 2026-10-18 20:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0009_order_delivery_address'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRollupDelta',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('not_started', 'Not started'), ('cooking_rejected', 'Cooking rejected'), ('cooking', 'Cooking'), ('cooked', 'Cooked'), ('delivery_lookup', 'Delivery lookup'), ('delivery', 'Delivery'), ('delivered', 'Delivered'), ('not_delivered', 'Not delivered'), ('failed', 'Failed'), ('cancelled_by_customer', 'Cancelled by customer'), ('cancelled_by_manager', 'Cancelled by manager'), ('cancelled_by_admin', 'Cancelled by admin'), ('cancelled_by_restaurant', 'Cancelled by restaurant'), ('cancelled_by_driver', 'Cancelled by driver')], max_length=50)),
+                ('delta', models.IntegerField()),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='food.restaurant')),
+            ],
+            options={
+                'db_table': 'order_rollup_deltas',
+            },
+        ),
+    ]
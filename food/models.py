@@ -1,5 +1,4 @@
 from django.db import models
-from django.db.models import QuerySet
 
 from .enums import OrderStatus
 from django.conf import settings
@@ -17,6 +16,10 @@ class Restaurant(models.Model):
 class Dish(models.Model):
     class Meta:
         db_table = "dishes"
+        constraints = [
+            # conflict target of the CSV importer upserts
+            models.UniqueConstraint(fields=["restaurant", "name"], name="dishes_restaurant_name_uniq"),
+        ]
 
     name = models.CharField(max_length=255, null=False)
     price = models.IntegerField()
@@ -32,6 +35,12 @@ class Dish(models.Model):
 class Order(models.Model):
     class Meta:
         db_table = "orders"
+        indexes = [
+            # keyset pagination of the filtered order listings
+            models.Index(fields=["status", "-id"], name="orders_status_id_idx"),
+            models.Index(fields=["user", "-id"], name="orders_user_id_idx"),
+            models.Index(fields=["eta", "-id"], name="orders_eta_id_idx"),
+        ]
 
     status = models.CharField(
         max_length=50,
@@ -40,6 +49,9 @@ class Order(models.Model):
         )
 
     delivery_provider = models.CharField(max_length=20, null=True, blank=True)
+    delivery_address = models.CharField(max_length=255, blank=True, default="")
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     total = models.PositiveIntegerField(null=True)
     eta = models.DateField()
     user = models.ForeignKey(
@@ -50,15 +62,12 @@ class Order(models.Model):
     def __str__(self):
         return f"[{self.pk}] {self.status} for {self.user.email}"
 
-    def items_by_restaurant(self) -> dict["Restaurant", QuerySet["OrderItem"]]:
-        results = {}
+    def items_by_restaurant(self) -> dict["Restaurant", list["OrderItem"]]:
+        """Group order items by restaurant with a single query"""
+        results: dict[Restaurant, list[OrderItem]] = {}
 
-        qs = self.items.select_related("dish__restaurant")
-
-        restaurants = {item.dish.restaurant for item in qs}
-
-        for restaurant in restaurants:
-            results[restaurant] = qs.filter(dish__restaurant=restaurant)
+        for item in self.items.select_related("dish__restaurant"):
+            results.setdefault(item.dish.restaurant, []).append(item)
 
         return results
 
@@ -79,4 +88,96 @@ class OrderItem(models.Model):
     )
 
     def __str__(self):
-        return f"[{self.order.pk}] {self.dish.name} for {self.quantity}"
\ No newline at end of file
+        return f"[{self.order_id}] {self.dish.name} for {self.quantity}"
+
+class OrderStatusHistory(models.Model):
+    """Append-only status timeline of an order, written by ``food.state``"""
+
+    class Meta:
+        db_table = "order_status_history"
+        indexes = [
+            models.Index(fields=["order", "created_at"], name="order_history_order_idx"),
+        ]
+
+    order = models.ForeignKey(
+        "Order",
+        on_delete=models.CASCADE,
+        related_name="history"
+    )
+    from_status = models.CharField(max_length=50, choices=OrderStatus.choices(), null=True)
+    to_status = models.CharField(max_length=50, choices=OrderStatus.choices())
+    source = models.CharField(max_length=20, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"[{self.order_id}] {self.from_status} -> {self.to_status}"
+
+class OrderRollup(models.Model):
+    """
+    Number of orders per ETA day, status and restaurant.
+
+    Maintained incrementally from ``OrderRollupDelta`` rows (see
+    ``food.rollups``), ``rebuild_rollups`` recounts it from scratch. An
+    order with dishes of several restaurants is counted once for each of
+    them.
+    """
+
+    class Meta:
+        db_table = "order_rollups"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "status", "restaurant"], name="order_rollups_key_uniq"),
+        ]
+
+    day = models.DateField()
+    status = models.CharField(max_length=50, choices=OrderStatus.choices())
+    restaurant = models.ForeignKey(
+        "Restaurant",
+        on_delete=models.CASCADE,
+        related_name="rollups"
+    )
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.status} {self.restaurant_id}: {self.count}"
+
+
+class OrderRollupDelta(models.Model):
+    """
+    Pending change of an ``OrderRollup`` count.
+
+    Status changes only append rows here, in their own transaction, so
+    they never wait on each other for a hot rollup row. ``fold_rollups``
+    adds them to ``order_rollups`` and deletes them.
+    """
+
+    class Meta:
+        db_table = "order_rollup_deltas"
+
+    id = models.BigAutoField(primary_key=True)
+    day = models.DateField()
+    status = models.CharField(max_length=50, choices=OrderStatus.choices())
+    restaurant = models.ForeignKey(
+        "Restaurant",
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    delta = models.IntegerField()
+
+class OutboxMessage(models.Model):
+    """
+    Celery task waiting to be published by ``relay_outbox``.
+
+    Rows are written in the transaction that produced them, so a task is
+    published only if that transaction commits.
+    """
+
+    class Meta:
+        db_table = "outbox"
+
+    task = models.CharField(max_length=255)
+    queue = models.CharField(max_length=50, default="default")
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"[{self.pk}] {self.task}"
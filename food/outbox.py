@@ -0,0 +1,57 @@
+import time
+
+from django.db import transaction
+
+from config import celery_app
+from .models import OutboxMessage
+
+
+def enqueue(task, payload: dict, queue: str = "default") -> OutboxMessage:
+    """Schedule a Celery task as part of the current transaction"""
+    return OutboxMessage.objects.create(task=task.name, queue=queue, payload=payload)
+
+
+class OutboxRelay:
+    """
+    Publish committed outbox rows to the broker in batches.
+
+    A batch is locked with ``SKIP LOCKED`` so several relays can run side
+    by side, published over a single broker connection and deleted in the
+    same transaction. A crash between publishing and commit republishes
+    the batch, so outbox tasks must be idempotent (``place_order`` skips
+    sub-orders that were already placed).
+    """
+
+    def __init__(self, batch_size: int = 100, interval: float = 0.5):
+        self.batch_size = batch_size
+        self.interval = interval
+
+    def run(self):
+        while True:
+            # a full batch means more rows are probably waiting
+            if self.relay() < self.batch_size:
+                time.sleep(self.interval)
+
+    def relay(self) -> int:
+        with transaction.atomic():
+            messages = list(
+                OutboxMessage.objects.select_for_update(skip_locked=True)
+                .order_by("id")[:self.batch_size]
+            )
+
+            if not messages:
+                return 0
+
+            with celery_app.producer_or_acquire() as producer:
+                for message in messages:
+                    celery_app.send_task(
+                        message.task,
+                        args=[message.payload],
+                        queue=message.queue,
+                        producer=producer,
+                    )
+
+            OutboxMessage.objects.filter(id__in=[message.pk for message in messages]).delete()
+
+        print(f"Relayed {len(messages)} outbox messages")
+        return len(messages)
@@ -0,0 +1,6 @@
+from .base import Provider
+from .registry import PROVIDERS, register, get_provider
+# importing the provider modules registers them
+from . import silpo, kfc
+
+__all__ = ["Provider", "PROVIDERS", "register", "get_provider", "silpo", "kfc"]
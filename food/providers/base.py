@@ -0,0 +1,51 @@
+import abc
+from dataclasses import asdict
+from typing import Any, Iterable
+
+import httpx
+
+from food.enums import OrderStatus
+from .pool import AsyncPooledClient
+
+
+class Provider(abc.ABC):
+    """
+    Restaurant integration used by the order dispatcher.
+
+    ``name`` is the lower-cased restaurant name the provider is registered
+    under. Providers with ``polling = True`` are followed by the tracker's
+    event loop, the rest report status changes through webhooks.
+    """
+
+    name: str
+    restaurant_name: str
+    base_url: str
+    polling: bool = False
+    status_map: dict[str, OrderStatus] = {}
+
+    def get_internal_status(self, status: str) -> OrderStatus:
+        return self.status_map[status]
+
+    @abc.abstractmethod
+    def build_request_body(self, items: Iterable[Any]) -> Any:
+        """Build the provider order body from ``(dish name, quantity)`` items"""
+
+    @abc.abstractmethod
+    def parse_response(self, payload: dict) -> Any:
+        """Turn a provider JSON response into its ``OrderResponse``"""
+
+    async def create_order(self, body: Any):
+        client = AsyncPooledClient.for_provider(self.name)
+        response: httpx.Response = await client.post(self.base_url, json=asdict(body))
+
+        response.raise_for_status()
+
+        return self.parse_response(response.json())
+
+    async def get_order(self, external_id: str):
+        client = AsyncPooledClient.for_provider(self.name)
+        response: httpx.Response = await client.get(f"{self.base_url}/{external_id}")
+
+        response.raise_for_status()
+
+        return self.parse_response(response.json())
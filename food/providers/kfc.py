@@ -0,0 +1,51 @@
+import enum
+from dataclasses import dataclass
+
+from food.enums import OrderStatus as InternalStatus
+from .base import Provider
+from .registry import register
+
+
+class OrderStatus(enum.StrEnum):
+    NOT_STARTED = "not started"
+    COOKING = "cooking"
+    COOKED = "cooked"
+    FINISHED = "finished"
+
+@dataclass
+class OrderItem:
+    dish: str
+    quantity: int
+
+
+@dataclass
+class OrderRequestBody:
+    order: list[OrderItem]
+
+@dataclass
+class OrderResponse:
+    id: str
+    status: OrderStatus
+
+
+@register
+class KFCProvider(Provider):
+    """KFC reports status changes to ``webhooks/kfc/``, so it is never polled"""
+
+    name = "kfc"
+    restaurant_name = "KFC"
+    base_url = "http://localhost:8002/api/orders"
+    status_map = {
+        OrderStatus.NOT_STARTED: InternalStatus.NOT_STARTED,
+        OrderStatus.COOKING: InternalStatus.COOKING,
+        OrderStatus.COOKED: InternalStatus.COOKED,
+        OrderStatus.FINISHED: InternalStatus.COOKED,
+    }
+
+    def build_request_body(self, items) -> OrderRequestBody:
+        return OrderRequestBody(
+            order=[OrderItem(dish=dish, quantity=quantity) for dish, quantity in items]
+        )
+
+    def parse_response(self, payload: dict) -> OrderResponse:
+        return OrderResponse(**payload)
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+
+import httpx
+from django.conf import settings
+
+# Failures where the request never reached the provider, so even
+# non-idempotent calls (order creation) are safe to repeat.
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# seconds between two stats log lines of a provider
+STATS_LOG_INTERVAL = 60.0
+
+
+@dataclass
+class PoolSettings:
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 2.0
+    read_timeout: float = 5.0
+    pool_timeout: float = 2.0
+    retries: int = 3
+    backoff: float = 0.2
+
+    @classmethod
+    def for_provider(cls, provider: str) -> "PoolSettings":
+        """Merge ``default`` and provider entries of PROVIDER_HTTP_POOLS"""
+        pools: dict = getattr(settings, "PROVIDER_HTTP_POOLS", {})
+        return cls(**{**pools.get("default", {}), **pools.get(provider, {})})
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.read_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+class PoolStats:
+    """
+    Per-provider counters used to size the pools.
+
+    A request is a *hit* when it was sent over an already open keep-alive
+    connection and a *miss* when a new TCP connection had to be opened.
+    The counters are printed as one JSON line at most every
+    ``STATS_LOG_INTERVAL`` seconds and served by ``shared.views.sql_profiles``.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.retries = 0
+        self.failures = 0
+        self.logged_at = time.monotonic()
+
+    def incr(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+            now = time.monotonic()
+            if now - self.logged_at < STATS_LOG_INTERVAL:
+                return
+
+            self.logged_at = now
+            data = self._snapshot()
+
+        print(json.dumps({"event": "http_pool_stats", "provider": self.provider, **data}))
+
+    def _snapshot(self) -> dict:
+        requests = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "retries": self.retries,
+            "failures": self.failures,
+            "hit_rate": round(self.hits / requests, 3) if requests else None,
+        }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return self._snapshot()
+
+
+STATS: dict[str, PoolStats] = {}
+
+
+def get_stats(provider: str) -> PoolStats:
+    if provider not in STATS:
+        STATS.setdefault(provider, PoolStats(provider))
+
+    return STATS[provider]
+
+
+def pool_stats() -> dict[str, dict]:
+    """Counters of every provider pool opened by this process"""
+    return {provider: stats.snapshot() for provider, stats in list(STATS.items())}
+
+
+def should_retry(method: str, error: Exception | None, response: httpx.Response | None) -> bool:
+    if isinstance(error, CONNECT_ERRORS):
+        return True
+    if method not in IDEMPOTENT_METHODS:
+        return False
+    if error is not None:
+        return isinstance(error, httpx.TransportError)
+    return response is not None and response.status_code >= 500
+
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_pid: int | None = None
+_loop_lock = threading.Lock()
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop of this process, running for its whole life in a daemon thread.
+
+    Provider pools are bound to the loop they were opened on; sharing one
+    loop between calls keeps their keep-alive connections warm. Forked
+    Celery children start their own loop.
+    """
+    global _loop, _loop_pid
+
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(target=_loop.run_forever, name="providers", daemon=True).start()
+
+    return _loop
+
+
+def run(coroutine):
+    """Run a coroutine on the worker loop from synchronous code and wait for it"""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_worker_loop()).result()
+
+
+class AsyncPooledClient:
+    """
+    Long-lived keep-alive ``httpx.AsyncClient`` shared by every call to a provider.
+
+    Async connections are bound to the loop they were opened on, so the
+    instances are cached per provider for the running loop. Synchronous
+    callers go through ``run`` to reuse the process' worker loop.
+    """
+
+    _instances: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def __init__(self, provider: str, pool_settings: PoolSettings | None = None):
+        self.provider = provider
+        self.settings = pool_settings or PoolSettings.for_provider(provider)
+        self.stats = get_stats(provider)
+        self.client = httpx.AsyncClient(
+            limits=self.settings.limits, timeout=self.settings.timeout
+        )
+
+    @classmethod
+    def for_provider(cls, provider: str) -> "AsyncPooledClient":
+        clients = cls._instances.setdefault(asyncio.get_running_loop(), {})
+
+        if provider not in clients:
+            clients[provider] = cls(provider)
+
+        return clients[provider]
+
+    def _trace(self, connected: list):
+        async def trace(event_name: str, info: dict):
+            if event_name == "connection.connect_tcp.started":
+                connected.append(True)
+
+        return trace
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        method = method.upper()
+
+        for attempt in range(self.settings.retries + 1):
+            connected: list = []
+            error, response = None, None
+            try:
+                response = await self.client.request(
+                    method, url, extensions={"trace": self._trace(connected)}, **kwargs
+                )
+            except httpx.TransportError as exc:
+                error = exc
+
+            self.stats.incr("misses" if connected else "hits")
+
+            if attempt == self.settings.retries or not should_retry(method, error, response):
+                break
+
+            self.stats.incr("retries")
+            await asyncio.sleep(self.settings.backoff * 2 ** attempt)
+
+        if error is not None:
+            self.stats.incr("failures")
+            raise error
+
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+        clients = self._instances.get(asyncio.get_running_loop(), {})
+        clients.pop(self.provider, None)
@@ -0,0 +1,20 @@
+from .base import Provider
+
+PROVIDERS: dict[str, Provider] = {}
+
+
+def register(provider_class: type[Provider]) -> type[Provider]:
+    """Class decorator: make the provider available to the dispatcher"""
+    provider = provider_class()
+    PROVIDERS[provider.name] = provider
+
+    return provider_class
+
+
+def get_provider(restaurant_name: str) -> Provider:
+    try:
+        return PROVIDERS[restaurant_name.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Restaurant {restaurant_name} is not available for processing"
+        )
@@ -1,7 +1,9 @@
 import enum
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
-import httpx
+from food.enums import OrderStatus as InternalStatus
+from .base import Provider
+from .registry import register
 
 
 class OrderStatus(enum.StrEnum):
@@ -25,23 +27,24 @@ class OrderResponse:
     id: str
     status: OrderStatus
 
-class Client:
-    BASE_URL = "http://localhost:8001/api/orders"
 
-    @classmethod
-    def create_order(cls, order: OrderRequestBody):
-        response: httpx.Response = httpx.post(
-            cls.BASE_URL, json=asdict(order)
+@register
+class SilpoProvider(Provider):
+    name = "silpo"
+    restaurant_name = "Silpo"
+    base_url = "http://localhost:8001/api/orders"
+    polling = True
+    status_map = {
+        OrderStatus.NOT_STARTED: InternalStatus.NOT_STARTED,
+        OrderStatus.COOKING: InternalStatus.COOKING,
+        OrderStatus.COOKED: InternalStatus.COOKED,
+        OrderStatus.FINISHED: InternalStatus.COOKED,
+    }
+
+    def build_request_body(self, items) -> OrderRequestBody:
+        return OrderRequestBody(
+            order=[OrderItem(dish=dish, quantity=quantity) for dish, quantity in items]
         )
 
-        response.raise_for_status()
-
-        return OrderResponse(**response.json())
-
-    @classmethod
-    def get_order(cls, order_id: str):
-        response: httpx.Response = httpx.get(f"{cls.BASE_URL}/{order_id}")
-
-        response.raise_for_status()
-
-        return OrderResponse(**response.json())
\ No newline at end of file
+    def parse_response(self, payload: dict) -> OrderResponse:
+        return OrderResponse(**payload)
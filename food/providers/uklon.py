@@ -0,0 +1,72 @@
+import enum
+from dataclasses import asdict, dataclass
+
+import httpx
+
+from food.enums import OrderStatus as InternalStatus
+from .pool import AsyncPooledClient
+
+
+class OrderStatus(enum.StrEnum):
+    NOT_STARTED = "not started"
+    DELIVERY = "delivery"
+    DELIVERED = "delivered"
+
+@dataclass
+class OrderRequestBody:
+    addresses: list[str]
+    comments: list[str]
+
+@dataclass
+class OrderResponse:
+    id: str
+    status: OrderStatus
+    addresses: list[str]
+    comments: list[str]
+    location: tuple[float, float]
+
+
+class UklonProvider:
+    """
+    Delivery provider: one driver order carries several drop-off addresses.
+
+    Not a restaurant ``Provider``, so it is not in the restaurant registry.
+    """
+
+    name = "uklon"
+    base_url = "http://localhost:8003/drivers/orders"
+    status_map = {
+        OrderStatus.NOT_STARTED: InternalStatus.DELIVERY_LOOKUP,
+        OrderStatus.DELIVERY: InternalStatus.DELIVERY,
+        OrderStatus.DELIVERED: InternalStatus.DELIVERED,
+    }
+
+    def get_internal_status(self, status: str) -> InternalStatus:
+        return self.status_map[status]
+
+    def parse_response(self, payload: dict) -> OrderResponse:
+        latitude, longitude = payload["location"]
+
+        return OrderResponse(
+            id=payload["id"],
+            status=OrderStatus(payload["status"]),
+            addresses=payload["addresses"],
+            comments=payload["comments"],
+            location=(float(latitude), float(longitude)),
+        )
+
+    async def create_order(self, body: OrderRequestBody) -> OrderResponse:
+        client = AsyncPooledClient.for_provider(self.name)
+        response: httpx.Response = await client.post(self.base_url, json=asdict(body))
+
+        response.raise_for_status()
+
+        return self.parse_response(response.json())
+
+    async def get_order(self, external_id: str) -> OrderResponse:
+        client = AsyncPooledClient.for_provider(self.name)
+        response: httpx.Response = await client.get(f"{self.base_url}/{external_id}")
+
+        response.raise_for_status()
+
+        return self.parse_response(response.json())
@@ -0,0 +1,69 @@
+import os
+import threading
+
+from shared.invalidation import bus
+from .models import Restaurant
+
+
+class RestaurantRegistry:
+    """
+    Process-local name/id -> Restaurant lookup.
+
+    Restaurants are loaded with one query on first use and dropped when
+    any process saves or deletes a restaurant (see ``food.signals``).
+    Without a working invalidation channel nothing is cached and every
+    lookup goes to the database.
+    """
+
+    CHANNEL = "restaurants:invalidate"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_name: dict[str, Restaurant] | None = None
+        self._by_id: dict[int, Restaurant] | None = None
+        self._pid: int | None = None
+
+    def _load(self) -> tuple[dict[str, Restaurant], dict[int, Restaurant]]:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._by_name, self._by_id = None, None
+                self._pid = os.getpid()
+
+            if self._by_name is not None:
+                return self._by_name, self._by_id
+
+            subscribed = bus.subscribe(self.CHANNEL, lambda _: self.invalidate())
+            restaurants = list(Restaurant.objects.all())
+            by_name = {restaurant.name.lower(): restaurant for restaurant in restaurants}
+            by_id = {restaurant.pk: restaurant for restaurant in restaurants}
+
+            if subscribed:
+                self._by_name, self._by_id = by_name, by_id
+
+            return by_name, by_id
+
+    def get(self, name: str | None = None, pk: int | None = None) -> Restaurant:
+        """Case-insensitive lookup by name or by primary key"""
+        by_name, by_id = self._load()
+        restaurant = by_name.get(name.lower()) if name is not None else by_id.get(pk)
+
+        if restaurant is None:
+            raise Restaurant.DoesNotExist(f"Restaurant {name or pk} does not exist")
+
+        return restaurant
+
+    def all(self) -> list[Restaurant]:
+        _, by_id = self._load()
+        return list(by_id.values())
+
+    def invalidate(self):
+        with self._lock:
+            self._by_name, self._by_id = None, None
+
+    def broadcast(self):
+        """Invalidate the registry of every process, this one included"""
+        self.invalidate()
+        bus.publish(self.CHANNEL)
+
+
+restaurants = RestaurantRegistry()
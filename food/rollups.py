@@ -0,0 +1,199 @@
+from collections import Counter
+from datetime import date
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import OrderItem, OrderRollup, OrderRollupDelta
+
+# Key order is fixed so concurrent folds lock rollup rows in the same
+# order. Both Postgres and SQLite support this upsert syntax.
+UPSERT_SQL = """
+INSERT INTO order_rollups (day, status, restaurant_id, count)
+VALUES {values}
+ON CONFLICT (day, status, restaurant_id)
+DO UPDATE SET count = order_rollups.count + excluded.count
+"""
+
+# Take the oldest deltas off the table, rows held by another fold are skipped
+TAKE_DELTAS_SQL = """
+WITH batch AS (
+    SELECT id FROM order_rollup_deltas
+    ORDER BY id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+)
+DELETE FROM order_rollup_deltas
+USING batch
+WHERE order_rollup_deltas.id = batch.id
+RETURNING day, status, restaurant_id, delta
+"""
+
+# Advisory lock id: folds hold it shared, a rebuild exclusively
+FOLD_LOCK = 0x6F726472
+
+RollupKey = tuple[date, str, int]
+
+
+def order_restaurants(order_ids: Iterable[int]) -> dict[int, tuple[date, set[int]]]:
+    """ETA and restaurants of every order, with one query"""
+    results: dict[int, tuple[date, set[int]]] = {}
+
+    rows = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values_list("order_id", "order__eta", "dish__restaurant_id")
+        .distinct()
+    )
+    for order_id, eta, restaurant_id in rows:
+        results.setdefault(order_id, (eta, set()))[1].add(restaurant_id)
+
+    return results
+
+
+def record(deltas: Counter[RollupKey]):
+    """
+    Append the deltas in the caller's transaction with one INSERT.
+
+    Nothing is updated in place, so concurrent status changes of the same
+    restaurant and day never wait for each other. ``fold`` adds them to
+    the counts later.
+    """
+    OrderRollupDelta.objects.bulk_create(
+        [
+            OrderRollupDelta(day=day, status=status, restaurant_id=restaurant_id, delta=delta)
+            for (day, status, restaurant_id), delta in sorted(deltas.items())
+            if delta
+        ]
+    )
+
+
+def apply(deltas: Counter[RollupKey]):
+    """Add the deltas to the ``order_rollups`` counts with one upsert"""
+    deltas = {key: delta for key, delta in sorted(deltas.items()) if delta}
+    if not deltas:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT_SQL.format(values=", ".join(["(%s, %s, %s, %s)"] * len(deltas))),
+            [value for key, delta in deltas.items() for value in (*key, delta)],
+        )
+
+
+def record_transitions(previous: dict[int, str], status: str):
+    """Move the orders of a transition from their previous status rollups to ``status``"""
+    deltas: Counter[RollupKey] = Counter()
+
+    for order_id, (eta, restaurant_ids) in order_restaurants(previous).items():
+        for restaurant_id in restaurant_ids:
+            deltas[(eta, previous[order_id], restaurant_id)] -= 1
+            deltas[(eta, str(status), restaurant_id)] += 1
+
+    record(deltas)
+
+
+def record_created(statuses: dict[int, str]):
+    """Count new orders, given as ``{order_id: status}``, once their items exist"""
+    deltas: Counter[RollupKey] = Counter()
+
+    for order_id, (eta, restaurant_ids) in order_restaurants(statuses).items():
+        for restaurant_id in restaurant_ids:
+            deltas[(eta, str(statuses[order_id]), restaurant_id)] += 1
+
+    record(deltas)
+
+
+def _take(batch_size: int) -> list[tuple]:
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(TAKE_DELTAS_SQL, [batch_size])
+            return cursor.fetchall()
+
+    # SQLite serializes writers, a read then a delete is equivalent
+    rows = list(
+        OrderRollupDelta.objects.order_by("id")
+        .values_list("id", "day", "status", "restaurant_id", "delta")[:batch_size]
+    )
+    OrderRollupDelta.objects.filter(id__in=[row[0] for row in rows]).delete()
+
+    return [row[1:] for row in rows]
+
+
+def fold(batch_size: int = 5000) -> int:
+    """
+    Move up to ``batch_size`` pending deltas into ``order_rollups``.
+
+    Deltas of the same rollup are summed first, so a busy restaurant costs
+    one row update per fold instead of one per status change. Returns the
+    number of deltas folded.
+    """
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock_shared(%s)", [FOLD_LOCK])
+
+        rows = _take(batch_size)
+        deltas: Counter[RollupKey] = Counter()
+        for day, status, restaurant_id, delta in rows:
+            deltas[(day, status, restaurant_id)] += delta
+
+        apply(deltas)
+
+    if rows:
+        print(f"Folded {len(rows)} rollup deltas into {len(deltas)} rollups")
+
+    return len(rows)
+
+
+def _recount() -> int:
+    rows = (
+        OrderItem.objects.values("order__eta", "order__status", "dish__restaurant_id")
+        .annotate(count=Count("order_id", distinct=True))
+        .order_by()
+    )
+
+    # the recount already covers every delta this transaction can see
+    OrderRollupDelta.objects.all().delete()
+    OrderRollup.objects.all().delete()
+    created = OrderRollup.objects.bulk_create(
+        [
+            OrderRollup(
+                day=row["order__eta"],
+                status=row["order__status"],
+                restaurant_id=row["dish__restaurant_id"],
+                count=row["count"],
+            )
+            for row in rows.iterator(chunk_size=5000)
+        ],
+        batch_size=5000,
+    )
+
+    return len(created)
+
+
+def rebuild() -> int:
+    """
+    Recount every rollup from ``orders`` and ``order_items``.
+
+    Status changes are not blocked. On Postgres the recount and the
+    deletion of pending deltas share one REPEATABLE READ snapshot, so the
+    deltas of transactions committed meanwhile stay and are folded on top
+    of the recount. Only folds wait for the rebuild.
+    """
+    if connection.vendor != "postgresql":
+        with transaction.atomic(durable=True):
+            return _recount()
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [FOLD_LOCK])
+
+    try:
+        with transaction.atomic(durable=True):
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+            return _recount()
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [FOLD_LOCK])
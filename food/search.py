@@ -0,0 +1,45 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, IntegerField, QuerySet, Value, When
+
+from .models import Dish
+
+
+def search_dishes(
+    query: str,
+    restaurant_id: int | None = None,
+    dishes: QuerySet[Dish] | None = None,
+) -> QuerySet[Dish]:
+    """
+    Dishes whose name matches ``query``, best matches first.
+
+    On Postgres ``%>`` (word similarity above
+    ``pg_trgm.word_similarity_threshold``) is served by the trigram GIN
+    index on ``dishes.name``, so misspelled and partial words still match
+    without scanning the table. Other databases fall back to a ranked
+    ``icontains`` scan, which is fine for SQLite test runs.
+    """
+    dishes = Dish.objects.all() if dishes is None else dishes
+    query = query.strip()
+
+    if restaurant_id is not None:
+        dishes = dishes.filter(restaurant_id=restaurant_id)
+
+    if connection.vendor == "postgresql":
+        return (
+            dishes.filter(name__trigram_word_similar=query)
+            .annotate(rank=TrigramWordSimilarity(query, "name"))
+            .order_by("-rank", "name", "id")
+        )
+
+    return (
+        dishes.filter(name__icontains=query)
+        .annotate(
+            rank=Case(
+                When(name__istartswith=query, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("-rank", "name", "id")
+    )
@@ -1,173 +1,158 @@
-from dataclasses import dataclass, field, asdict
-from time import sleep
-
-from django.db.models import QuerySet
-from mypy.types import names
+import asyncio
 
 from config import celery_app
 
 from shared.cache import CacheService
 from .enums import OrderStatus
-from .mapper import RESTAURANT_EXTERNAL_TO_INTERNAL
+from .messages import PlaceOrderMessage, SubOrder
+from . import events, outbox, state
 from .models import Order, Restaurant, OrderItem
-from .providers import silpo, kfc
+from .providers import get_provider
+from .providers import pool
+from .tracking import TrackingOrder, OrderTracker
 
+# failed sub-orders are retried this many times, RETRY_DELAY seconds apart
+# at first and twice as long after every attempt
+MAX_RETRIES = 6
+RETRY_DELAY = 5
 
-@dataclass
-class TrackingOrder:
-    restaurants: dict = field(default_factory=dict)
-    delivery: dict = field(default_factory=dict)
 
-def all_orders_cooked(order_id):
-    cache = CacheService()
-    tracking_order = TrackingOrder(
-        **cache.get(namespace="orders", key=str(order_id))
-    )
-    print(f"Checking if all orders are cooked: {tracking_order.restaurants}")
+async def place_sub_orders(sub_orders: dict[str, SubOrder]) -> dict:
+    """
+    Create the external order of every restaurant concurrently.
 
-    results = all(
-        payload["status"] == OrderStatus.COOKED
-        for _, payload in tracking_order.restaurants.items()
-    )
+    Failures are returned in place of the provider response, so one
+    unavailable restaurant does not cancel the others.
+    """
 
-    return results
+    async def place(sub_order: SubOrder):
+        provider = get_provider(sub_order.restaurant)
+        body = provider.build_request_body(sub_order.dish_quantities())
+        return await provider.create_order(body)
 
-@celery_app.task(queue="default")
-def order_in_silpo(order_id: int, items: QuerySet[OrderItem]):
-    client = silpo.Client()
-    cache = CacheService()
-    restaurant = Restaurant.objects.get(name="Silpo")
+    results = await asyncio.gather(
+        *(place(sub_order) for sub_order in sub_orders.values()),
+        return_exceptions=True,
+    )
 
-    def get_internal_status(status: silpo.OrderStatus) -> OrderStatus:
-        return RESTAURANT_EXTERNAL_TO_INTERNAL["silpo"][status]
+    return dict(zip(sub_orders, results))
 
-    cooked = False
-    while not cooked:
-        sleep(1)
 
-        tracking_order = TrackingOrder(
-            **cache.get(namespace="orders", key=str(order_id))
-        )
+@celery_app.task(queue="default", bind=True, max_retries=MAX_RETRIES)
+def place_order(self, message: dict):
+    """
+    Place every not yet placed sub-order of the order in one pass.
 
-        silpo_order = tracking_order.restaurants.get(str(restaurant.pk))
+    Polling providers are handed over to ``OrderTracker``, webhook providers
+    get a reverse ``<provider>_orders`` mapping for their callbacks. The
+    task is retried while any sub-order fails, placed ones are skipped.
+    """
+    cache = CacheService()
+    message = PlaceOrderMessage.from_dict(message)
+    order_id = message.order_id
+    tracking_order = TrackingOrder.load(order_id, cache)
 
-        if not silpo_order:
-            raise ValueError(f"No Silpo in orders processing")
+    if not tracking_order.restaurants:
+        tracking_order = init_tracking(message, cache)
 
-        print(f"Current Silpo order status: {silpo['status']}")
+    sub_orders = {
+        restaurant_id: sub_order
+        for restaurant_id, sub_order in message.sub_orders.items()
+        if not tracking_order.restaurants[restaurant_id]["external_id"]
+    }
 
-        if not silpo_order["external_id"]:
-            response: silpo.OrderResponse = client.create_order(
-                silpo.OrderRequestBody(
-                    order=[
-                        silpo.OrderItem(dish=item.dish.name, quantity=item.quantity)
-                        for item in items
-                    ]
-                )
-            )
-            internal_status : OrderStatus = get_internal_status(response.status)
+    results = pool.run(place_sub_orders(sub_orders))
 
-            tracking_order.restaurants[str(restaurant.pk)] = {
-                "external_id": response.id,
-                "status": internal_status,
-            }
+    errors, placed = [], []
+    for restaurant_id, response in results.items():
+        provider = get_provider(sub_orders[restaurant_id].restaurant)
 
-            cache.set(namespace="orders", key=str(order_id), value=asdict(tracking_order))
+        if isinstance(response, Exception):
+            print(f"{provider.restaurant_name} order failed for Order {order_id}: {response}")
+            errors.append(response)
         else:
-
-            response = client.get_order(str(silpo_order["external_id"]))
-            internal_status = get_internal_status(response.status)
-            print(f"Tracking for Silpo Order with HTTP GET api/orders. Status: {internal_status}")
-
-            if silpo_order["status"] != internal_status:
-                tracking_order.restaurants[str(restaurant.pk)]["status"] = internal_status
-                print(f"Silpo order status changed to {internal_status}")
-                cache.set(
-                    namespace="orders",
-                    key=str(order_id),
-                    value=asdict(tracking_order)
-                )
-                if internal_status == OrderStatus.COOKING:
-                    Order.objects.filter(id=order_id).update(status=OrderStatus.COOKING)
-
-            if internal_status == OrderStatus.COOKED:
-                print("Order is cooked")
-                cooked = True
-
-                if all_orders_cooked(order_id)
-                    cache.set(
-                        namespace="orders",
-                        key=str(order_id),
-                        value=asdict(tracking_order)
-                    )
-
-@celery_app.task(queue="high_priority")
-def order_in_kfc(order_id: int, items):
-    client = kfc.Client()
-    cache = CacheService()
-    restaurant = Restaurant.objects.get(name="KFC")
-
-    def get_internal_status(status: kfc.OrderStatus) -> OrderStatus:
-        return RESTAURANT_EXTERNAL_TO_INTERNAL["kfc"][status]
-
-    tracking_order = TrackingOrder(
-        **cache.get(namespace="orders", key=str(order_id))
+            placed.append((restaurant_id, provider, response))
+
+    # before the tracker and the webhooks can see the order, so a faster
+    # status update is never overwritten with the one of the response
+    statuses = TrackingOrder.set_statuses(
+        [
+            (order_id, restaurant_id, provider.get_internal_status(response.status))
+            for restaurant_id, provider, response in placed
+        ],
+        cache,
     )
 
-    response: kfc.OrderResponse = client.create_order(
-        kfc.OrderRequestBody(
-            order=[
-                kfc.OrderItem(dish=item.dish.name, quantity=item.quantity)
-                for item in items
-            ]
-        )
-    )
+    # external ids, reverse mappings and tracker registrations in one round-trip
+    with cache.pipeline(transaction=False) as pipeline:
+        for restaurant_id, provider, response in placed:
+            TrackingOrder.update_restaurant(
+                order_id, restaurant_id, pipeline, external_id=response.id
+            )
 
-    internal_status = get_internal_status(response.status)
+            if provider.polling:
+                OrderTracker.register(provider.name, order_id, pipeline)
+            else:
+                pipeline.set(
+                    namespace=f"{provider.name}_orders",
+                    key=response.id,
+                    value={"internal_order_id": order_id}
+                )
 
-    tracking_order.restaurants[str(restaurant.pk)] = {
-        "external_id": response.id,
-        "status": internal_status,
-    }
+    status_events = []
+    for (restaurant_id, provider, response), (changed, completed) in zip(placed, statuses):
+        print(f"Created {provider.restaurant_name} Order. External ID: {response.id}")
 
-    print(f"Created MOCKED KFC Order. External ID: {response.id}, Status: {internal_status}")
+        if changed:
+            status_events.append(
+                events.order_event(
+                    order_id, provider.get_internal_status(response.status), restaurant_id
+                )
+            )
 
-    cache.set(namespace="orders", key=str(order_id), value=asdict(tracking_order))
+        if completed and state.transition([order_id], OrderStatus.COOKED, source="place_order"):
+            status_events.append(events.order_event(order_id, OrderStatus.COOKED))
 
-    cache.set(namespace="kfc_orders",
-              key=response.id,
-              value={"internal_order_id": order_id}
-              )
+    events.publish_events(status_events, cache)
 
-def build_request_body():
-    pass
+    if errors:
+        raise self.retry(exc=errors[0], countdown=RETRY_DELAY * 2 ** self.request.retries)
 
-def schedule_order(order: Order):
-    cache = CacheService()
+def build_request_body(restaurant: Restaurant, items: list[OrderItem]) -> SubOrder:
+    """Compact, provider-agnostic request body of one restaurant"""
+    return SubOrder(
+        restaurant=restaurant.name,
+        items=[[item.dish_id, item.dish.name, item.quantity] for item in items],
+    )
+
+def init_tracking(message: PlaceOrderMessage, cache: CacheService) -> TrackingOrder:
+    """Initial tracking state of a freshly scheduled order"""
     tracking_order = TrackingOrder()
 
-    items_by_restaurant = order.items_by_restaurant()
-    for restaurant, items in items_by_restaurant.items():
-        tracking_order.restaurants[str(restaurant.pk)] = {
+    for restaurant_id, sub_order in message.sub_orders.items():
+        tracking_order.restaurants[restaurant_id] = {
             "external_id": None,
             "status": OrderStatus.NOT_STARTED,
-            "request_body": build_request_body(restaurant, items)
+            "request_body": sub_order.items,
         }
 
-    cache.set(
-        namespace="orders",
-        key=str(order.pk),
-        value=asdict(tracking_order)
-    )
+    tracking_order.save(message.order_id, cache)
+
+    return tracking_order
+
+def schedule_order(order: Order):
+    """
+    Queue ``place_order`` through the outbox.
+
+    Must run in the transaction that created the order: nothing reaches
+    the broker or Redis until it commits (see ``food.outbox``).
+    """
+    message = PlaceOrderMessage(order_id=order.pk)
 
+    for restaurant, items in order.items_by_restaurant().items():
+        # fail fast for restaurants without a registered provider
+        get_provider(restaurant.name)
 
+        message.sub_orders[str(restaurant.pk)] = build_request_body(restaurant, items)
 
-    for restaurant, items in items_by_restaurant.items():
-        match restaurant.name.lower():
-            case "silpo":
-                order_in_silpo.delay(order.pk, items)
-            case "kfc":
-                order_in_kfc.delay(order.pk, items)
-            case _:
-                raise ValueError(f"Restaurant {restaurant.name} is not available for processing")
-    return
+    outbox.enqueue(place_order, message.to_dict())
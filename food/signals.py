@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .menu import menu
+from .models import Dish, Restaurant
+from .restaurants import restaurants
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def invalidate_restaurants(sender, instance: Restaurant, **kwargs):
+    transaction.on_commit(restaurants.broadcast)
+    menu.rebuild_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Dish)
+@receiver(post_delete, sender=Dish)
+def rebuild_menu(sender, instance: Dish, **kwargs):
+    menu.rebuild_on_commit(instance.restaurant_id)
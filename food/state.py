@@ -0,0 +1,135 @@
+from typing import Iterable
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+
+from . import rollups
+from .enums import OrderStatus
+from .models import Order, OrderStatusHistory
+
+CANCELLED_BY_STAFF = {OrderStatus.CANCELLED_BY_MANAGER, OrderStatus.CANCELLED_BY_ADMIN}
+
+# status -> statuses it may move to, anything else is rejected
+TRANSITIONS: dict[OrderStatus, set[OrderStatus]] = {
+    OrderStatus.NOT_STARTED: {
+        OrderStatus.COOKING,
+        OrderStatus.COOKED,
+        OrderStatus.COOKING_REJECTED,
+        OrderStatus.FAILED,
+        OrderStatus.CANCELLED_BY_CUSTOMER,
+        OrderStatus.CANCELLED_BY_RESTAURANT,
+        *CANCELLED_BY_STAFF,
+    },
+    OrderStatus.COOKING: {
+        OrderStatus.COOKED,
+        OrderStatus.COOKING_REJECTED,
+        OrderStatus.FAILED,
+        OrderStatus.CANCELLED_BY_RESTAURANT,
+        *CANCELLED_BY_STAFF,
+    },
+    OrderStatus.COOKED: {
+        OrderStatus.DELIVERY_LOOKUP,
+        OrderStatus.FAILED,
+        *CANCELLED_BY_STAFF,
+    },
+    OrderStatus.DELIVERY_LOOKUP: {
+        OrderStatus.DELIVERY,
+        OrderStatus.NOT_DELIVERED,
+        OrderStatus.FAILED,
+        OrderStatus.CANCELLED_BY_DRIVER,
+        *CANCELLED_BY_STAFF,
+    },
+    OrderStatus.DELIVERY: {
+        OrderStatus.DELIVERED,
+        OrderStatus.NOT_DELIVERED,
+        OrderStatus.FAILED,
+        OrderStatus.CANCELLED_BY_DRIVER,
+    },
+    # the order goes back to the driver lookup
+    OrderStatus.CANCELLED_BY_DRIVER: {OrderStatus.DELIVERY_LOOKUP},
+}
+
+ALLOWED_FROM: dict[OrderStatus, list[str]] = {
+    status: sorted(source for source, targets in TRANSITIONS.items() if status in targets)
+    for status in OrderStatus
+}
+
+# Lock the matching rows in id order (no deadlocks between batches) and
+# return the status each row had right before the update.
+TRANSITION_SQL = """
+WITH previous AS (
+    SELECT id, status FROM orders
+    WHERE id = ANY(%s) AND status = ANY(%s)
+    ORDER BY id
+    FOR UPDATE
+)
+UPDATE orders SET status = %s
+FROM previous
+WHERE orders.id = previous.id
+RETURNING orders.id, previous.status
+"""
+
+
+def _update(order_ids: list[int], status: OrderStatus, allowed: list[str]) -> dict[int, str]:
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(TRANSITION_SQL, [order_ids, allowed, status])
+            return dict(cursor.fetchall())
+
+    # SQLite serializes writers, a read then a guarded update is equivalent
+    previous = dict(
+        Order.objects.filter(id__in=order_ids, status__in=allowed).values_list("id", "status")
+    )
+    Order.objects.filter(id__in=previous, status__in=allowed).update(status=status)
+
+    return previous
+
+
+def transition(
+    order_ids: Iterable[int], status: OrderStatus, source: str = ""
+) -> dict[int, OrderStatus]:
+    """
+    Move orders to ``status`` where ``TRANSITIONS`` allows it.
+
+    One conditional UPDATE for the whole batch plus one bulk INSERT into
+    the status history. Returns the previous status of every order that
+    actually changed, illegal and repeated transitions are skipped.
+    """
+    order_ids = sorted(set(order_ids))
+    if not order_ids or not ALLOWED_FROM[status]:
+        return {}
+
+    with transaction.atomic():
+        previous = _update(order_ids, status, ALLOWED_FROM[status])
+
+        OrderStatusHistory.objects.bulk_create(
+            [
+                OrderStatusHistory(
+                    order_id=order_id,
+                    from_status=from_status,
+                    to_status=status,
+                    source=source,
+                )
+                for order_id, from_status in previous.items()
+            ]
+        )
+        rollups.record_transitions(previous, status)
+
+    return {order_id: OrderStatus(from_status) for order_id, from_status in previous.items()}
+
+
+atransition = sync_to_async(transition)
+
+
+def record_created(orders: Iterable[Order], source: str = ""):
+    """History entry and rollup counts of freshly created orders and their items"""
+    orders = list(orders)
+
+    with transaction.atomic():
+        OrderStatusHistory.objects.bulk_create(
+            [
+                OrderStatusHistory(order_id=order.pk, from_status=None, to_status=order.status, source=source)
+                for order in orders
+            ]
+        )
+        rollups.record_created({order.pk: order.status for order in orders})
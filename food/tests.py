@@ -1,3 +1,814 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+import httpx
+from redis import RedisError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from shared.tests import RedisTestMixin, async_cache
+from users.models import User
+from . import events, export, importer, locations, rollups, services, state
+from .delivery import BatchingSettings, DeliveryDispatcher, Stop, group_stops
+from .enums import OrderStatus
+from .menu import menu
+from .models import (
+    Dish,
+    Order,
+    OrderItem,
+    OrderRollup,
+    OrderRollupDelta,
+    OrderStatusHistory,
+    OutboxMessage,
+    Restaurant,
+)
+from .providers import kfc, silpo, uklon
+from .restaurants import restaurants
+from .tracking import OrderTracker, TrackingOrder
+from .webhooks import KFC_GROUP, KFC_STREAM, KFCEventConsumer, enqueue_kfc_events
+
+
+def create_customer(**fields) -> User:
+    return User.objects.create_user(
+        **{
+            "email": "customer@example.com",
+            "password": "password",
+            "phone_number": "0500000000",
+            "first_name": "John",
+            "last_name": "Doe",
+            **fields,
+        }
+    )
+
+
+def create_restaurant(name: str) -> Restaurant:
+    restaurant = Restaurant.objects.create(name=name, address="Kyiv")
+    # a TestCase never commits, so the registry would not hear of it
+    restaurants.invalidate()
+
+    return restaurant
+
+
+def create_admin() -> User:
+    return User.objects.create_superuser(
+        email="admin@example.com",
+        password="password",
+        phone_number="0500000001",
+        first_name="Jane",
+        last_name="Doe",
+    )
+
+
+class CreateOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_customer()
+        silpo = create_restaurant("Silpo")
+        kfc = create_restaurant("KFC")
+        cls.dishes = Dish.objects.bulk_create(
+            [
+                Dish(name=f"Dish {number}", price=100, restaurant=silpo if number % 2 else kfc)
+                for number in range(30)
+            ]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_order(self, dishes: list[Dish], eta: date | None = None, **fields):
+        return self.client.post(
+            "/food/orders/",
+            {
+                "items": [{"dish": dish.pk, "quantity": 2} for dish in dishes],
+                "eta": (eta or date.today() + timedelta(days=1)).isoformat(),
+                "delivery_address": "Khreshchatyk St, 1, Kyiv",
+                **fields,
+            },
+            format="json",
+        )
+
+    def test_creates_order_items_and_outbox_message(self):
+        response = self.create_order(self.dishes[:3])
+
+        self.assertEqual(response.status_code, 201, response.content)
+        order = Order.objects.get(pk=response.data["id"])
+        self.assertEqual(order.total, 3 * 2 * 100)
+        self.assertEqual(order.items.count(), 3)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_query_count_does_not_grow_with_items(self):
+        query_counts = []
+
+        for dishes in (self.dishes[:1], self.dishes):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.create_order(dishes)
+
+            self.assertEqual(response.status_code, 201, response.content)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_eta_must_be_after_today(self):
+        response = self.create_order(self.dishes[:1], eta=date.today())
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("eta", response.data)
+
+    def test_delivery_address_is_required(self):
+        response = self.create_order(self.dishes[:1], delivery_address="")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("delivery_address", response.data)
+
+    def test_unknown_dishes_are_rejected(self):
+        response = self.create_order([Dish(pk=10_000)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class KFCEventConsumerTests(RedisTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = create_customer()
+        cls.kfc = create_restaurant("KFC")
+        cls.order = Order.objects.create(
+            status=OrderStatus.NOT_STARTED, user=user, eta=date.today() + timedelta(days=1)
+        )
+        OrderItem.objects.create(
+            order=cls.order,
+            quantity=1,
+            dish=Dish.objects.create(name="Bucket", price=300, restaurant=cls.kfc),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.consumer = KFCEventConsumer(consumer="tests")
+        self.consumer.cache = self.cache
+
+        TrackingOrder(
+            restaurants={
+                str(self.kfc.pk): {"external_id": "kfc-1", "status": OrderStatus.NOT_STARTED}
+            }
+        ).save(self.order.pk, self.cache)
+        self.cache.set("kfc_orders", "kfc-1", {"internal_order_id": self.order.pk})
+        self.cache.create_group(*KFC_STREAM, KFC_GROUP)
+
+        self.subscriber = self.redis.pubsub()
+        self.addCleanup(self.subscriber.close)
+        self.subscriber.subscribe(events.channel(self.order.pk))
+        # the subscribe confirmation
+        self.subscriber.get_message(timeout=1)
+
+    def published(self) -> list[dict]:
+        messages = []
+        while message := self.subscriber.get_message(timeout=0.1):
+            messages.append(json.loads(message["data"]))
+
+        return messages
+
+    def test_process_applies_and_acknowledges_a_batch(self):
+        enqueue_kfc_events(
+            [
+                {"id": "kfc-1", "status": "cooking"},
+                {"id": "kfc-1", "status": "cooked"},
+                {"id": "unknown", "status": "cooked"},
+            ],
+            self.cache,
+        )
+        batch = self.read()
+
+        self.consumer.process(batch)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, OrderStatus.COOKED)
+        self.assertEqual(
+            list(OrderStatusHistory.objects.filter(order=self.order).values_list("to_status", flat=True)),
+            [OrderStatus.COOKED],
+        )
+        self.assertEqual(
+            self.published(),
+            [
+                events.order_event(self.order.pk, OrderStatus.COOKING, self.kfc.pk),
+                events.order_event(self.order.pk, OrderStatus.COOKED, self.kfc.pk),
+                events.order_event(self.order.pk, OrderStatus.COOKED),
+            ],
+        )
+        # only the event of the unknown order waits for its mapping
+        self.assertEqual(
+            self.cache.read_events(*KFC_STREAM, group=KFC_GROUP, consumer="tests", pending=True),
+            [batch[2]],
+        )
+
+    def read(self) -> list:
+        return self.cache.read_events(*KFC_STREAM, group=KFC_GROUP, consumer="tests")
+
+    def test_events_wait_for_their_order_in_sequence(self):
+        self.cache.delete("kfc_orders", "kfc-1")
+        enqueue_kfc_events([{"id": "kfc-1", "status": "cooking"}], self.cache)
+        self.consumer.process(self.read())
+
+        # the mapping is written, but the newer event must wait for the older one
+        self.cache.set("kfc_orders", "kfc-1", {"internal_order_id": self.order.pk})
+        enqueue_kfc_events([{"id": "kfc-1", "status": "cooked"}], self.cache)
+        self.consumer.process(self.read())
+
+        self.assertEqual(self.published(), [])
+        self.assertEqual(self.consumer.replay(), 2)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, OrderStatus.COOKED)
+        self.assertEqual(
+            [event["status"] for event in self.published()],
+            [OrderStatus.COOKING, OrderStatus.COOKED, OrderStatus.COOKED],
+        )
+        self.assertEqual(self.consumer.replay(), 0)
+
+    def test_events_of_unknown_orders_are_dropped_after_mapping_wait(self):
+        enqueue_kfc_events([{"id": "unknown", "status": "cooked"}], self.cache)
+        self.consumer.process(self.read())
+        self.assertEqual(self.consumer.replay(), 1)
+
+        self.consumer.mapping_wait = 0
+        self.assertEqual(self.consumer.replay(), 1)
+        self.assertEqual(self.consumer.replay(), 0)
+
+    def test_replayed_batch_changes_nothing(self):
+        enqueue_kfc_events([{"id": "kfc-1", "status": "cooked"}], self.cache)
+        batch = self.read()
+
+        self.consumer.process(batch)
+        self.published()
+        self.consumer.process(batch)
+
+        self.assertEqual(self.published(), [])
+        self.assertEqual(OrderStatusHistory.objects.filter(order=self.order).count(), 1)
+
+
+class RollupTests(TransactionTestCase):
+    def setUp(self):
+        user = create_customer()
+        self.eta = date.today() + timedelta(days=1)
+        self.silpo = create_restaurant("Silpo")
+        self.kfc = create_restaurant("KFC")
+        dishes = [
+            Dish.objects.create(name="Soup", price=100, restaurant=self.silpo),
+            Dish.objects.create(name="Bucket", price=300, restaurant=self.kfc),
+        ]
+        self.orders = []
+
+        for number in range(3):
+            order = Order.objects.create(status=OrderStatus.NOT_STARTED, user=user, eta=self.eta)
+            OrderItem.objects.bulk_create(
+                [OrderItem(order=order, dish=dish, quantity=1) for dish in dishes[:number + 1]]
+            )
+            self.orders.append(order)
+
+        state.record_created(self.orders)
+
+    def counts(self) -> dict:
+        return {
+            (rollup.status, rollup.restaurant_id): rollup.count
+            for rollup in OrderRollup.objects.filter(count__gt=0)
+        }
+
+    def test_status_changes_are_appended_and_folded(self):
+        state.transition([order.pk for order in self.orders[:2]], OrderStatus.COOKING)
+
+        self.assertFalse(OrderRollup.objects.exists())
+        self.assertEqual(rollups.fold(batch_size=2), 2)
+        self.assertGreater(rollups.fold(), 0)
+        self.assertFalse(OrderRollupDelta.objects.exists())
+        self.assertEqual(
+            self.counts(),
+            {
+                (OrderStatus.COOKING, self.silpo.pk): 2,
+                (OrderStatus.COOKING, self.kfc.pk): 1,
+                (OrderStatus.NOT_STARTED, self.silpo.pk): 1,
+                (OrderStatus.NOT_STARTED, self.kfc.pk): 1,
+            },
+        )
+
+    def test_rebuild_matches_folded_counts(self):
+        rollups.fold()
+        state.transition([self.orders[0].pk], OrderStatus.COOKED)
+        rollups.fold()
+        folded = self.counts()
+
+        state.transition([self.orders[1].pk], OrderStatus.CANCELLED_BY_CUSTOMER)
+        rollups.rebuild()
+
+        self.assertFalse(OrderRollupDelta.objects.exists())
+        self.assertEqual(
+            self.counts(),
+            {
+                **folded,
+                (OrderStatus.NOT_STARTED, self.silpo.pk): 1,
+                (OrderStatus.NOT_STARTED, self.kfc.pk): 1,
+                (OrderStatus.CANCELLED_BY_CUSTOMER, self.silpo.pk): 1,
+                (OrderStatus.CANCELLED_BY_CUSTOMER, self.kfc.pk): 1,
+            },
+        )
+
+
+class LocationTrackerTests(RedisTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = create_customer()
+        cls.order = Order.objects.create(
+            status=OrderStatus.DELIVERY_LOOKUP, user=user, eta=date.today() + timedelta(days=1)
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.cache.set("uklon_orders", "uklon-1", {"internal_order_ids": [self.order.pk]})
+        self.cache.add_member(DeliveryDispatcher.NAMESPACE, "uklon", "uklon-1")
+        self.cache.add_member(DeliveryDispatcher.NAMESPACE, "uklon", "expired")
+
+    async def tick(self, status: uklon.OrderStatus, location: tuple[float, float] = (50.45, 30.52)):
+        async def get_order(external_id: str) -> uklon.OrderResponse:
+            return uklon.OrderResponse(
+                id=external_id, status=status, addresses=[], comments=[], location=location
+            )
+
+        tracker = locations.LocationTracker()
+        tracker.provider.get_order = get_order
+
+        async with async_cache() as cache:
+            tracker.cache = cache
+            await tracker.tick(asyncio.Semaphore(1))
+
+    async def test_track_expires_while_delivering(self):
+        await self.tick(uklon.OrderStatus.DELIVERY)
+
+        self.assertIsNotNone(locations.where_is(self.order.pk, cache=self.cache))
+        self.assertGreater(self.redis.ttl(f"locations:{self.order.pk}"), 0)
+        self.assertEqual(self.cache.members(DeliveryDispatcher.NAMESPACE, "uklon"), {"uklon-1"})
+
+    async def test_positions_beyond_the_geo_range_are_skipped(self):
+        await self.tick(uklon.OrderStatus.DELIVERY, location=(89.9, 30.52))
+
+        await self.order.arefresh_from_db()
+        self.assertEqual(self.order.status, OrderStatus.DELIVERY)
+        self.assertIsNone(locations.where_is(self.order.pk, cache=self.cache))
+
+    async def test_delivered_order_keys_are_deleted(self):
+        await self.tick(uklon.OrderStatus.DELIVERED)
+
+        await self.order.arefresh_from_db()
+        self.assertEqual(self.order.status, OrderStatus.DELIVERED)
+        self.assertIsNone(locations.where_is(self.order.pk, cache=self.cache))
+        self.assertFalse(self.redis.exists(f"locations:{self.order.pk}", "uklon_orders:uklon-1"))
+        self.assertEqual(self.cache.members(DeliveryDispatcher.NAMESPACE, "uklon"), set())
+
+
+class OrderEventsTests(RedisTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_customer()
+        cls.order = Order.objects.create(
+            status=OrderStatus.NOT_STARTED, user=cls.user, eta=date.today() + timedelta(days=1)
+        )
+
+    async def test_failed_state_read_unsubscribes(self):
+        token = await asyncio.to_thread(AccessToken.for_user, self.user)
+
+        with mock.patch.object(TrackingOrder, "aload", side_effect=RedisError("down")):
+            response = await self.async_client.get(
+                f"/food/orders/{self.order.pk}/events/", headers={"Authorization": f"Bearer {token}"}
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(events.hub._queues, {})
+
+
+class OrderTrackerTests(RedisTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = create_customer()
+        cls.silpo = create_restaurant("Silpo")
+        cls.orders = Order.objects.bulk_create(
+            [
+                Order(status=OrderStatus.NOT_STARTED, user=user, eta=date.today() + timedelta(days=1))
+                for _ in range(3)
+            ]
+        )
+
+    def setUp(self):
+        super().setUp()
+
+        for order in self.orders:
+            TrackingOrder(
+                restaurants={
+                    str(self.silpo.pk): {"external_id": f"silpo-{order.pk}", "status": OrderStatus.NOT_STARTED}
+                }
+            ).save(order.pk, self.cache)
+            OrderTracker.register("silpo", order.pk, self.cache)
+
+    async def test_failing_orders_do_not_stop_the_others(self):
+        cooked, unknown, broken = self.orders
+
+        async def get_order(external_id: str) -> silpo.OrderResponse:
+            if external_id == f"silpo-{broken.pk}":
+                raise RuntimeError("malformed response")
+
+            status = "cooked" if external_id == f"silpo-{cooked.pk}" else None
+            return silpo.OrderResponse(id=external_id, status=status)
+
+        tracker = OrderTracker("silpo")
+        tracker.restaurant = self.silpo
+
+        with mock.patch.object(tracker.provider, "get_order", get_order):
+            async with async_cache() as cache:
+                tracker.cache = cache
+                await tracker.tick(asyncio.Semaphore(10))
+
+        statuses = {order.pk: order.status async for order in Order.objects.all()}
+        self.assertEqual(
+            statuses,
+            {
+                cooked.pk: OrderStatus.COOKED,
+                unknown.pk: OrderStatus.NOT_STARTED,
+                broken.pk: OrderStatus.NOT_STARTED,
+            },
+        )
+        self.assertEqual(
+            self.cache.members(OrderTracker.NAMESPACE, "silpo"), {str(unknown.pk), str(broken.pk)}
+        )
+
+
+class PlaceOrderTests(RedisTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.order = Order.objects.create(
+            status=OrderStatus.NOT_STARTED, user=create_customer(), eta=date.today() + timedelta(days=1)
+        )
+        cls.silpo = create_restaurant("Silpo")
+        cls.kfc = create_restaurant("KFC")
+        dishes = [
+            Dish.objects.create(name="Soup", price=100, restaurant=cls.silpo),
+            Dish.objects.create(name="Bucket", price=300, restaurant=cls.kfc),
+        ]
+        OrderItem.objects.bulk_create(
+            [OrderItem(order=cls.order, quantity=1, dish=dish) for dish in dishes]
+        )
+
+    def test_failed_sub_orders_are_retried_alone(self):
+        attempts = []
+
+        async def place_sub_orders(sub_orders):
+            attempts.append(sorted(sub_order.restaurant for sub_order in sub_orders.values()))
+            responses = {"Silpo": silpo.OrderResponse(id="silpo-1", status="cooking")}
+            responses["KFC"] = (
+                httpx.ConnectError("KFC is down") if len(attempts) == 1
+                else kfc.OrderResponse(id="kfc-1", status="not started")
+            )
+
+            return {
+                restaurant_id: responses[sub_order.restaurant]
+                for restaurant_id, sub_order in sub_orders.items()
+            }
+
+        services.schedule_order(self.order)
+        message = OutboxMessage.objects.get().payload
+
+        with mock.patch.object(services, "place_sub_orders", place_sub_orders):
+            services.place_order.apply(args=[message])
+
+        tracking_order = TrackingOrder.load(self.order.pk, self.cache)
+        self.assertEqual(attempts, [["KFC", "Silpo"], ["KFC"]])
+        self.assertEqual(
+            {
+                restaurant_id: (entry["external_id"], entry["status"])
+                for restaurant_id, entry in tracking_order.restaurants.items()
+            },
+            {
+                str(self.silpo.pk): ("silpo-1", OrderStatus.COOKING),
+                str(self.kfc.pk): ("kfc-1", OrderStatus.NOT_STARTED),
+            },
+        )
+        self.assertEqual(self.cache.get("kfc_orders", "kfc-1"), {"internal_order_id": self.order.pk})
+        self.assertEqual(self.cache.members(OrderTracker.NAMESPACE, "silpo"), {str(self.order.pk)})
+
+
+class ExportOrdersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_admin()
+        restaurant = create_restaurant("Silpo")
+        dish = Dish.objects.create(name="Soup", price=100, restaurant=restaurant)
+
+        for quantity in (1, 2, 3):
+            order = Order.objects.create(
+                status=OrderStatus.NOT_STARTED, user=cls.admin, eta=date.today() + timedelta(days=1)
+            )
+            OrderItem.objects.create(order=order, dish=dish, quantity=quantity)
+
+        cls.token = str(AccessToken.for_user(cls.admin))
+
+    def export(self, output: str) -> bytes:
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get(f"/food/orders/export/?output={output}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        return b"".join(response.streaming_content)
+
+    async def aexport(self, output: str) -> bytes:
+        response = await self.async_client.get(
+            f"/food/orders/export/?output={output}", headers={"Authorization": f"Bearer {self.token}"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        # a sync iterator would be read into memory by the ASGI handler
+        self.assertTrue(response.is_async)
+        return b"".join([part async for part in response.streaming_content])
+
+    async def test_asgi_streams_the_same_export(self):
+        for output in ("ndjson", "csv"):
+            with self.subTest(output=output):
+                self.assertEqual(await self.aexport(output), await sync_to_async(self.export)(output))
+
+    async def test_rows_are_read_in_chunks(self):
+        rows = (row for row in ["a\n", "b\n", "c\n"])
+
+        self.assertEqual([part async for part in export.aiterate(rows, chunk_size=2)], ["a\nb\n", "c\n"])
+        self.assertEqual(rows.gi_frame, None)
+
+
+class GroupStopsTests(SimpleTestCase):
+    eta = date(2026, 1, 1)
+
+    def stop(
+        self, order_id: int, point: tuple[float, float] | None, pickup: tuple[int, ...] = (1,)
+    ) -> Stop:
+        return Stop(
+            order_id=order_id, pickup=pickup, eta=self.eta, address=f"Address {order_id}", point=point
+        )
+
+    def routes(self, stops: list[Stop], **config) -> list[list[int]]:
+        return [
+            [stop.order_id for stop in route]
+            for route in group_stops(stops, BatchingSettings(**config))
+        ]
+
+    def test_only_drop_offs_within_the_detour_share_a_route(self):
+        stops = [
+            self.stop(1, (50.450, 30.520)),
+            self.stop(2, (50.500, 30.520)),  # 5.6 km north
+            self.stop(3, (50.455, 30.520)),  # 0.6 km north
+        ]
+
+        self.assertEqual(self.routes(stops), [[1, 3], [2]])
+
+    def test_routes_keep_to_max_stops(self):
+        stops = [self.stop(order_id, (50.45 + order_id / 10_000, 30.52)) for order_id in range(6)]
+
+        self.assertEqual(self.routes(stops, max_stops=4), [[0, 1, 2, 3], [4, 5]])
+
+    def test_orders_without_coordinates_are_delivered_alone(self):
+        stops = [self.stop(1, None), self.stop(2, (50.45, 30.52)), self.stop(3, (50.451, 30.52))]
+
+        self.assertEqual(self.routes(stops), [[1], [2, 3]])
+
+    def test_pickups_are_never_mixed(self):
+        stops = [self.stop(1, (50.45, 30.52), pickup=(1,)), self.stop(2, (50.45, 30.52), pickup=(2,))]
+
+        self.assertEqual(self.routes(stops), [[1], [2]])
+
+
+class DeliveryDispatcherTests(TestCase):
+    def test_orders_without_an_address_are_not_collected(self):
+        user = create_customer()
+
+        for address in ("Khreshchatyk St, 1, Kyiv", ""):
+            Order.objects.create(
+                status=OrderStatus.COOKED,
+                user=user,
+                eta=date.today() + timedelta(days=1),
+                delivery_provider="uklon",
+                delivery_address=address,
+            )
+
+        stops = DeliveryDispatcher().collect()
+
+        self.assertEqual([stop.address for stop in stops], ["Khreshchatyk St, 1, Kyiv"])
+
+
+class DishImportTests(RedisTestMixin, TestCase):
+    CSV = (
+        b"name,price,restaraunt\r\n"
+        b"Soup,100,Silpo\r\n"
+        b"Borscht,cheap,Silpo\r\n"
+        b"Pizza,250,Pizzeria\r\n"
+        b"Soup,120,Silpo\r\n"
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.silpo = create_restaurant("Silpo")
+
+    def test_lines_are_joined_into_chunks(self):
+        lines = SimpleUploadedFile("dishes.csv", self.CSV)
+
+        chunks = list(importer.join_lines(lines, size=40))
+
+        self.assertEqual(b"".join(chunks), self.CSV)
+        self.assertEqual([chunk.endswith(b"\n") for chunk in chunks], [True] * len(chunks))
+        self.assertGreater(len(chunks), 1)
+
+    def test_queued_import_reads_the_upload_from_redis(self):
+        job_id = importer.schedule_import(SimpleUploadedFile("dishes.csv", self.CSV))
+        self.assertEqual(importer.get_progress(job_id)["status"], "queued")
+
+        # the worker only gets the message, the upload is read from Redis
+        importer.import_dishes_file(OutboxMessage.objects.get().payload)
+
+        self.assertEqual(
+            list(Dish.objects.values_list("name", "price", "restaurant")), [("Soup", 120, self.silpo.pk)]
+        )
+        self.assertEqual(
+            importer.get_progress(job_id),
+            {
+                "status": "done",
+                "rows": 4,
+                "imported": 1,
+                "skipped": 2,
+                "errors": ["Line 3: invalid price 'cheap'", "Line 4: unknown restaurant 'Pizzeria'"],
+            },
+        )
+        self.assertFalse(self.redis.exists(f"{importer.UPLOADS}:{job_id}"))
+
+
+class MenuTests(RedisTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_customer()
+        cls.restaurant = create_restaurant("Silpo")
+        Dish.objects.create(name="Soup", price=100, restaurant=cls.restaurant)
+
+    def setUp(self):
+        super().setUp()
+        menu.invalidate()
+        self.addCleanup(menu.invalidate)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get("/food/dishes/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([dish["name"] for dish in response.json()[0]["dishes"]], ["Soup"])
+
+        response = self.client.get("/food/dishes/", headers={"If-None-Match": response["ETag"]})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_changed_menu_gets_a_new_etag(self):
+        etag = self.client.get("/food/dishes/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Dish.objects.create(name="Borsch", price=150, restaurant=self.restaurant)
+
+        response = self.client.get("/food/dishes/", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual([dish["name"] for dish in response.json()[0]["dishes"]], ["Soup", "Borsch"])
+
+    def test_compressed_body_is_served_when_accepted(self):
+        plain = self.client.get("/food/dishes/")
+        response = self.client.get("/food/dishes/", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["ETag"], plain["ETag"])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+
+class OrderPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_admin()
+        cls.orders = Order.objects.bulk_create(
+            [
+                Order(status=OrderStatus.NOT_STARTED, user=cls.admin, eta=date.today() + timedelta(days=1))
+                for _ in range(5)
+            ]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_pages_are_stable_while_orders_are_created(self):
+        ids = []
+        url = "/food/orders/?limit=2"
+
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(order["id"] for order in response.data["results"])
+            url = response.data["next"]
+
+            # newer orders are behind the cursor and never shift the pages
+            Order.objects.create(status=OrderStatus.NOT_STARTED, user=self.admin, eta=date.today())
+
+        self.assertEqual(ids, sorted((order.pk for order in self.orders), reverse=True))
+
+    def test_filters_apply_to_every_page(self):
+        cooking = [order.pk for order in self.orders[1:4]]
+        Order.objects.filter(pk__in=cooking).update(status=OrderStatus.COOKING)
+        ids = []
+        url = f"/food/orders/?limit=1&status={OrderStatus.COOKING.value}"
+
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(order["id"] for order in response.data["results"])
+            url = response.data["next"]
+
+        self.assertEqual(ids, sorted(cooking, reverse=True))
+
+
+class DishSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_customer()
+        cls.silpo = create_restaurant("Silpo")
+        cls.kfc = create_restaurant("KFC")
+        Dish.objects.bulk_create(
+            [
+                Dish(name="Chicken soup", price=100, restaurant=cls.silpo),
+                Dish(name="Spicy chicken", price=150, restaurant=cls.kfc),
+                Dish(name="Chicken bucket", price=300, restaurant=cls.kfc),
+                Dish(name="Borsch", price=120, restaurant=cls.silpo),
+            ]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params) -> list[str]:
+        response = self.client.get("/food/dishes/search/", params)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        return [dish["name"] for dish in response.data]
+
+    def test_names_starting_with_the_query_come_first(self):
+        self.assertEqual(self.search(q="chicken"), ["Chicken bucket", "Chicken soup", "Spicy chicken"])
+
+    def test_results_are_filtered_by_restaurant_and_limited(self):
+        self.assertEqual(self.search(q="chicken", restaurant=self.kfc.pk), ["Chicken bucket", "Spicy chicken"])
+        self.assertEqual(self.search(q="chicken", limit=1), ["Chicken bucket"])
+
+    def test_short_queries_are_rejected(self):
+        response = self.client.get("/food/dishes/search/", {"q": "c"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("q", response.data)
+
+
+class TransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = create_customer()
+        cls.cooking, cls.delivered = Order.objects.bulk_create(
+            [
+                Order(status=status, user=user, eta=date.today() + timedelta(days=1))
+                for status in (OrderStatus.COOKING, OrderStatus.DELIVERED)
+            ]
+        )
+
+    def statuses(self) -> list[OrderStatus]:
+        return [
+            Order.objects.get(pk=order.pk).status for order in (self.cooking, self.delivered)
+        ]
+
+    def test_only_allowed_transitions_are_applied(self):
+        previous = state.transition([self.cooking.pk, self.delivered.pk], OrderStatus.COOKED, source="test")
+
+        self.assertEqual(previous, {self.cooking.pk: OrderStatus.COOKING})
+        self.assertEqual(self.statuses(), [OrderStatus.COOKED, OrderStatus.DELIVERED])
+        self.assertEqual(
+            list(OrderStatusHistory.objects.values_list("order_id", "from_status", "to_status", "source")),
+            [(self.cooking.pk, OrderStatus.COOKING, OrderStatus.COOKED, "test")],
+        )
+
+    def test_illegal_and_repeated_transitions_change_nothing(self):
+        for status in (OrderStatus.NOT_STARTED, OrderStatus.COOKING, OrderStatus.DELIVERED):
+            with self.subTest(status=status):
+                self.assertEqual(state.transition([self.cooking.pk, self.delivered.pk], status), {})
+
+        self.assertEqual(self.statuses(), [OrderStatus.COOKING, OrderStatus.DELIVERED])
+        self.assertFalse(OrderStatusHistory.objects.exists())
@@ -0,0 +1,323 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import ClassVar
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from shared.cache import AsyncCacheService, CacheService
+from . import events, state
+from .enums import OrderStatus
+from .models import Restaurant
+from .providers import Provider, get_provider
+from .restaurants import restaurants
+
+
+@dataclass
+class TrackingOrder:
+    """
+    Tracking state of an order, stored as the ``orders:<id>`` Redis hash.
+
+    Every restaurant attribute is a separate hash field
+    (``<restaurant_id>:status``, ``<restaurant_id>:external_id``, ...) and
+    delivery attributes live under ``delivery:<name>``, so writers of
+    different restaurants never overwrite each other. ``meta:pending``
+    counts the restaurants that are not cooked yet.
+    """
+
+    NAMESPACE: ClassVar[str] = "orders"
+    PENDING: ClassVar[str] = "meta:pending"
+
+    restaurants: dict = field(default_factory=dict)
+    delivery: dict = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, order_id: int, cache: CacheService | None = None) -> "TrackingOrder":
+        fields = (cache or CacheService()).get_fields(
+            namespace=cls.NAMESPACE, key=str(order_id)
+        )
+
+        return cls.from_fields(fields)
+
+    @classmethod
+    async def aload(cls, order_id: int, cache: AsyncCacheService | None = None) -> "TrackingOrder":
+        fields = await (cache or AsyncCacheService()).get_fields(
+            namespace=cls.NAMESPACE, key=str(order_id)
+        )
+
+        return cls.from_fields(fields)
+
+    @classmethod
+    def from_fields(cls, fields: dict) -> "TrackingOrder":
+        tracking_order = cls()
+
+        for name, value in fields.items():
+            owner, attribute = name.split(":", 1)
+            if owner == "meta":
+                continue
+            elif owner == "delivery":
+                tracking_order.delivery[attribute] = value
+            else:
+                tracking_order.restaurants.setdefault(owner, {})[attribute] = value
+
+        return tracking_order
+
+    def save(self, order_id: int, cache: CacheService | None = None):
+        values = {
+            f"{restaurant_id}:{attribute}": value
+            for restaurant_id, entry in self.restaurants.items()
+            for attribute, value in entry.items()
+        }
+        values.update(
+            {f"delivery:{attribute}": value for attribute, value in self.delivery.items()}
+        )
+        values[self.PENDING] = sum(
+            1 for entry in self.restaurants.values()
+            if entry.get("status") != OrderStatus.COOKED
+        )
+
+        (cache or CacheService()).set_fields(
+            namespace=self.NAMESPACE, key=str(order_id), values=values
+        )
+
+    @classmethod
+    def update_restaurant(
+        cls, order_id: int, restaurant_id: int | str, cache: CacheService | None = None, **values
+    ):
+        """Write the given attributes of one restaurant entry"""
+        (cache or CacheService()).set_fields(
+            namespace=cls.NAMESPACE,
+            key=str(order_id),
+            values={f"{restaurant_id}:{attribute}": value for attribute, value in values.items()},
+        )
+
+    @classmethod
+    def update_delivery(cls, order_id: int, cache: CacheService | None = None, **values):
+        """Write the given delivery attributes"""
+        (cache or CacheService()).set_fields(
+            namespace=cls.NAMESPACE,
+            key=str(order_id),
+            values={f"delivery:{attribute}": value for attribute, value in values.items()},
+        )
+
+    @classmethod
+    async def aupdate_delivery(cls, order_id: int, cache: AsyncCacheService | None = None, **values):
+        await (cache or AsyncCacheService()).set_fields(
+            namespace=cls.NAMESPACE,
+            key=str(order_id),
+            values={f"delivery:{attribute}": value for attribute, value in values.items()},
+        )
+
+    @classmethod
+    def compare_and_set_status(
+        cls,
+        order_id: int,
+        restaurant_id: int | str,
+        expected: OrderStatus | None,
+        status: OrderStatus,
+        cache: CacheService | None = None,
+    ) -> bool:
+        """Change a restaurant status only if nobody changed it in between"""
+        return (cache or CacheService()).compare_and_set_field(
+            namespace=cls.NAMESPACE,
+            key=str(order_id),
+            field=f"{restaurant_id}:status",
+            expected=expected,
+            value=status,
+        )
+
+    @classmethod
+    def set_status(
+        cls,
+        order_id: int,
+        restaurant_id: int | str,
+        status: OrderStatus,
+        cache: CacheService | None = None,
+    ) -> tuple[bool, bool]:
+        """
+        Change a restaurant status and the pending counter atomically.
+
+        Returns ``(changed, completed)``: ``completed`` is True for exactly
+        one caller, the one whose change cooked the last restaurant.
+        """
+        [result] = cls.set_statuses([(order_id, restaurant_id, status)], cache)
+
+        return result
+
+    @classmethod
+    async def aset_status(
+        cls,
+        order_id: int,
+        restaurant_id: int | str,
+        status: OrderStatus,
+        cache: AsyncCacheService | None = None,
+    ) -> tuple[bool, bool]:
+        changed, remaining = await (cache or AsyncCacheService()).set_field_counted(
+            namespace=cls.NAMESPACE,
+            key=str(order_id),
+            field=f"{restaurant_id}:status",
+            value=status,
+            counter=cls.PENDING,
+            target=OrderStatus.COOKED,
+        )
+
+        return changed, remaining == 0
+
+    @classmethod
+    def set_statuses(
+        cls,
+        updates: list[tuple[int, int | str, OrderStatus]],
+        cache: CacheService | None = None,
+    ) -> list[tuple[bool, bool]]:
+        """Pipelined ``set_status`` for ``(order_id, restaurant_id, status)`` updates"""
+        results = (cache or CacheService()).set_fields_counted(
+            namespace=cls.NAMESPACE,
+            updates=[
+                (str(order_id), f"{restaurant_id}:status", status)
+                for order_id, restaurant_id, status in updates
+            ],
+            counter=cls.PENDING,
+            target=OrderStatus.COOKED,
+        )
+
+        return [(changed, remaining == 0) for changed, remaining in results]
+
+
+class OrderTracker:
+    """
+    Follow every in-flight order of a polling provider from one event loop.
+
+    ``place_order`` creates the external orders and registers the internal
+    order id in the ``tracking:<provider>`` set. Each tick the tracker polls
+    all registered orders concurrently (bounded by ``concurrency``) and
+    forgets an order once the provider reports it as cooked. Several
+    trackers may run side by side: each one only handles ids where
+    ``id % shards == shard``. A failing order is logged and polled again
+    on the next tick, it never stops the others.
+    """
+
+    NAMESPACE = "tracking"
+
+    def __init__(
+        self,
+        provider: str,
+        interval: float = 1.0,
+        concurrency: int = 200,
+        shards: int = 1,
+        shard: int = 0,
+    ):
+        self.provider: Provider = get_provider(provider)
+        self.interval = interval
+        self.concurrency = concurrency
+        self.shards = shards
+        self.shard = shard
+        self.cache: AsyncCacheService | None = None
+        self.restaurant: Restaurant | None = None
+
+    @classmethod
+    def register(cls, provider: str, order_id: int, cache: CacheService | None = None):
+        (cache or CacheService()).add_member(
+            namespace=cls.NAMESPACE, key=provider, member=str(order_id)
+        )
+
+    @classmethod
+    def unregister(cls, provider: str, order_id: int, cache: CacheService | None = None):
+        (cache or CacheService()).remove_member(
+            namespace=cls.NAMESPACE, key=provider, member=str(order_id)
+        )
+
+    async def run(self):
+        # async connections are bound to the loop, so the client is made here
+        self.cache = AsyncCacheService()
+        self.restaurant = await sync_to_async(restaurants.get)(
+            name=self.provider.restaurant_name
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        while True:
+            started = asyncio.get_running_loop().time()
+            try:
+                await self.tick(semaphore)
+            except Exception as error:
+                print(f"{self.provider.name} tracking tick failed: {error!r}")
+            elapsed = asyncio.get_running_loop().time() - started
+            await asyncio.sleep(max(self.interval - elapsed, 0))
+
+    async def tick(self, semaphore: asyncio.Semaphore):
+        members: set[str] = await self.cache.members(
+            namespace=self.NAMESPACE, key=self.provider.name
+        )
+        order_ids = [
+            int(member) for member in members
+            if int(member) % self.shards == self.shard
+        ]
+
+        results = await asyncio.gather(
+            *(self.poll(semaphore, order_id) for order_id in order_ids),
+            return_exceptions=True,
+        )
+
+        for order_id, result in zip(order_ids, results):
+            if isinstance(result, Exception):
+                print(f"{self.provider.name} tracking failed for Order {order_id}: {result!r}")
+
+    async def poll(self, semaphore: asyncio.Semaphore, order_id: int):
+        async with semaphore:
+            await self._poll(order_id)
+
+    async def _poll(self, order_id: int):
+        name = self.provider.name
+        restaurant_key = str(self.restaurant.pk)
+        tracking_order = await TrackingOrder.aload(order_id, self.cache)
+        external_order = tracking_order.restaurants.get(restaurant_key)
+
+        if not external_order or not external_order["external_id"]:
+            print(f"No {name} order to track for Order {order_id}")
+            await self.cache.remove_member(
+                namespace=self.NAMESPACE, key=name, member=str(order_id)
+            )
+            return
+
+        try:
+            response = await self.provider.get_order(str(external_order["external_id"]))
+        except httpx.HTTPError as error:
+            print(f"{name} polling failed for Order {order_id}: {error}")
+            return
+
+        try:
+            internal_status = self.provider.get_internal_status(response.status)
+        except KeyError:
+            print(f"{name} reported unknown status {response.status!r} for Order {order_id}")
+            return
+
+        if external_order["status"] != internal_status:
+            changed, completed = await TrackingOrder.aset_status(
+                order_id, restaurant_key, internal_status, self.cache
+            )
+
+            if changed:
+                print(f"{name} order status changed to {internal_status}")
+                await events.apublish_event(
+                    events.order_event(order_id, internal_status, restaurant_key), self.cache
+                )
+
+            if changed and internal_status == OrderStatus.COOKING and await state.atransition(
+                [order_id], OrderStatus.COOKING, source=name
+            ):
+                await events.apublish_event(
+                    events.order_event(order_id, OrderStatus.COOKING), self.cache
+                )
+
+            if completed and await state.atransition(
+                [order_id], OrderStatus.COOKED, source=name
+            ):
+                print(f"All orders are cooked for Order {order_id}")
+                await events.apublish_event(
+                    events.order_event(order_id, OrderStatus.COOKED), self.cache
+                )
+
+        if internal_status == OrderStatus.COOKED:
+            print(f"{name} order for Order {order_id} is cooked")
+            await self.cache.remove_member(
+                namespace=self.NAMESPACE, key=name, member=str(order_id)
+            )
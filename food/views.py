@@ -1,24 +1,40 @@
 import json
-from dataclasses import asdict
 from datetime import date
-from pyexpat.errors import messages
 
-from django.contrib.admindocs.utils import ROLES
-from django.http import JsonResponse
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import QuerySet
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
-from mypy.types import names
+from django.views.decorators.http import require_POST
 from rest_framework import viewsets, serializers, routers, permissions
 from rest_framework.decorators import action, permission_classes
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.request import Request
 from rest_framework.response import Response
 from django.db import transaction
-from services import schedule_order
-from shared.cache import CacheService
-
-from .models import Restaurant, Dish, Order, OrderItem, OrderStatus
+from asgiref.sync import sync_to_async
+from redis import RedisError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from . import events, importer
+from .export import EXPORTS, aiterate
+from .locations import orders_near, where_is
+from .menu import menu
+from .search import search_dishes
+from .state import record_created
+from .services import schedule_order
+
+from .models import Dish, Order, OrderItem, OrderRollup, OrderStatus
 from users.models import User, Role
-from .services import TrackingOrder, all_orders_cooked
+from .providers import kfc
+from .tracking import TrackingOrder
+from .webhooks import enqueue_kfc_events
 
 
 class DishSerializer(serializers.ModelSerializer):
@@ -26,14 +42,29 @@ class DishSerializer(serializers.ModelSerializer):
         model = Dish
         exclude = ["restaurant"]
 
+class DishSearchResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Dish
+        fields = ["id", "name", "price", "restaurant"]
+
+class DishSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=100)
+    restaurant = serializers.IntegerField(min_value=1, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=20)
+
 class OrderItemSerializer(serializers.Serializer):
-    dish = serializers.PrimaryKeyRelatedField(queryset=Dish.objects.all())
+    # dishes are resolved for the whole order at once, see validate_items
+    dish = serializers.IntegerField(min_value=1, source="dish_id")
     quantity = serializers.IntegerField(min_value=1, max_value=20)
 
 class OrderSerializer(serializers.Serializer):
     id = serializers.PrimaryKeyRelatedField(read_only=True)
     items = OrderItemSerializer(many=True)
     eta = serializers.DateField()
+    # every order is delivered by Uklon, see create_order
+    delivery_address = serializers.CharField(max_length=255)
+    latitude = serializers.FloatField(min_value=-90, max_value=90, required=False, allow_null=True)
+    longitude = serializers.FloatField(min_value=-180, max_value=180, required=False, allow_null=True)
     total = serializers.IntegerField(min_value=1, read_only=True)
     status = serializers.ChoiceField(OrderStatus.choices(), read_only=True)
 
@@ -48,22 +79,64 @@ class OrderSerializer(serializers.Serializer):
 
         return total
 
+    def validate_items(self, items: list[dict]) -> list[dict]:
+        """Resolve the dishes of every item with a single query"""
+        dishes = Dish.objects.select_related("restaurant").in_bulk(
+            {item["dish_id"] for item in items}
+        )
+        missing = sorted({item["dish_id"] for item in items} - dishes.keys())
+
+        if missing:
+            raise ValidationError(f"Dishes {missing} do not exist")
+
+        return [{**item, "dish": dishes[item["dish_id"]]} for item in items]
+
     def validate_eta(self, value: date):
-        if (value - date.today()) < 1:
+        if (value - date.today()).days < 1:
             raise ValidationError("ETA must be min 1 day after today")
         else:
             return value
 
-class RestaurantSerializer(serializers.ModelSerializer):
-    dishes = DishSerializer(many=True)
+class OrderFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(OrderStatus.choices(), required=False)
+    user = serializers.IntegerField(min_value=1, required=False)
+    eta_from = serializers.DateField(required=False)
+    eta_to = serializers.DateField(required=False)
 
+class OrderRollupSerializer(serializers.ModelSerializer):
     class Meta:
-        model = Restaurant
-        fields = "__all__"
+        model = OrderRollup
+        fields = ["day", "status", "restaurant", "count"]
+
+class OrderRollupFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(OrderStatus.choices(), required=False)
+    restaurant = serializers.IntegerField(min_value=1, required=False)
+    day_from = serializers.DateField(required=False)
+    day_to = serializers.DateField(required=False)
+
+class NearbyOrdersSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-85, max_value=85)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(min_value=0.1, max_value=50, default=2.0)
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=50)
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key.
+
+    Every page is an indexed ``WHERE id < <cursor> ORDER BY id DESC LIMIT n``
+    query, so deep pages cost the same as the first one, and orders created
+    while paging never shift or duplicate rows.
+    """
+
+    ordering = "-id"
+    page_size = 50
+    page_size_query_param = "limit"
+    max_page_size = 500
 
 class KFCOrderSerializer(serializers.Serializer):
-    pass
-        
+    id = serializers.CharField(max_length=64)
+    status = serializers.ChoiceField([status.value for status in kfc.OrderStatus])
 
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -76,16 +149,47 @@ class IsAdmin(permissions.BasePermission):
 class FoodAPIViewSet(viewsets.GenericViewSet):
     def get_permissions(self):
         match self.action:
-            case "all_orders":
+            case "all_orders" | "export_orders" | "order_rollups" | "nearby_orders":
                 return [permissions.IsAuthenticated(), IsAdmin()]
             case _:
                 return [permissions.IsAuthenticated()]
 
     @action(methods=["get"], detail=False)
-    def dishes(self, request: Request) -> Response:
-        restaurants = Restaurant.objects.all()
-        serializer = RestaurantSerializer(restaurants, many=True)
-        return Response(data=serializer.data)
+    def dishes(self, request: Request) -> HttpResponse:
+        """Serve the pre-rendered menu snapshot (see ``food.menu``)"""
+        snapshot = menu.get()
+
+        if snapshot.etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            accepted = request.headers.get("Accept-Encoding", "")
+            encoding = next(
+                (name for name in ("br", "gzip") if name in accepted and name in snapshot.encodings),
+                None,
+            )
+            response = HttpResponse(
+                snapshot.encodings[encoding] if encoding else snapshot.body,
+                content_type="application/json",
+            )
+            if encoding:
+                response["Content-Encoding"] = encoding
+
+        response["ETag"] = snapshot.etag
+        response["Cache-Control"] = "private, no-cache"
+        patch_vary_headers(response, ["Accept-Encoding"])
+
+        return response
+
+    @action(methods=["get"], detail=False, url_path="dishes/search")
+    def search(self, request: Request) -> Response:
+        params = DishSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        dishes = search_dishes(
+            params.validated_data["q"], restaurant_id=params.validated_data.get("restaurant")
+        )[:params.validated_data["limit"]]
+
+        return Response(DishSearchResultSerializer(dishes, many=True).data)
 
     @transaction.atomic
     @action(methods=["post"], detail=False, url_path=r"orders")
@@ -105,18 +209,24 @@ class FoodAPIViewSet(viewsets.GenericViewSet):
             user=request.user,
             delivery_provider="uklon",
             eta=serializer.validated_data["eta"],
+            delivery_address=serializer.validated_data["delivery_address"],
+            latitude=serializer.validated_data.get("latitude"),
+            longitude=serializer.validated_data.get("longitude"),
             total = serializer.calculated_total
         )
 
-        items = serializer.validated_data["items"]
-
-        for dish_order in items:
-            instance = OrderItem.objects.create(
-                dish=dish_order["dish"],
-                quantity=dish_order["quantity"],
-                order=order
-            )
-            print(f"New dish order item is created: {instance.pk}")
+        items = OrderItem.objects.bulk_create(
+            [
+                OrderItem(
+                    dish=dish_order["dish"],
+                    quantity=dish_order["quantity"],
+                    order=order
+                )
+                for dish_order in serializer.validated_data["items"]
+            ]
+        )
+        print(f"{len(items)} dish order items are created")
+        record_created([order], source="api")
 
         print(f"New food order is created {order.pk}. ETA: {order.eta}")
 
@@ -132,48 +242,228 @@ class FoodAPIViewSet(viewsets.GenericViewSet):
 
         return Response(data=serializer.data)
 
-    @action(methods=["get"], detail=False, url_path="orders")
-    def all_orders(self, request: Request) -> Response:
+    def filter_orders(self, request: Request) -> QuerySet[Order]:
+        filters = OrderFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        params = filters.validated_data
+
         orders = Order.objects.all()
-        serializer = OrderSerializer(orders, many=True)
+        if "status" in params:
+            orders = orders.filter(status=params["status"])
+        if "user" in params:
+            orders = orders.filter(user_id=params["user"])
+        if "eta_from" in params:
+            orders = orders.filter(eta__gte=params["eta_from"])
+        if "eta_to" in params:
+            orders = orders.filter(eta__lte=params["eta_to"])
+
+        return orders
+
+    @create_order.mapping.get
+    def all_orders(self, request: Request) -> Response:
+        orders = self.filter_orders(request).prefetch_related("items")
+        paginator = OrderCursorPagination()
+        page = paginator.paginate_queryset(orders, request, view=self)
+        serializer = OrderSerializer(page, many=True)
+
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(methods=["get"], detail=False, url_path=r"orders/(?P<id>\d+)/location")
+    def order_location(self, request: Request, id: int) -> Response:
+        """Where the driver of the order is, with the recent track (Redis only)"""
+        order = Order.objects.filter(id=id).only("id", "user_id").first()
+        if order is None or (order.user_id != request.user.pk and request.user.role != Role.ADMIN):
+            return Response({"message": "Order not found"}, status=404)
+
+        location = where_is(order.pk)
+        if location is None:
+            return Response({"message": "The order is not on the way"}, status=404)
+
+        return Response(location)
+
+    @action(methods=["get"], detail=False, url_path="orders/near")
+    def nearby_orders(self, request: Request) -> Response:
+        params = NearbyOrdersSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        return Response(
+            orders_near(
+                params.validated_data["latitude"],
+                params.validated_data["longitude"],
+                radius_km=params.validated_data["radius"],
+                count=params.validated_data["limit"],
+            )
+        )
+
+    @action(methods=["get"], detail=False, url_path="orders/rollups")
+    def order_rollups(self, request: Request) -> Response:
+        """
+        Order counts per ETA day, status and restaurant, read from ``order_rollups``.
+
+        Status changes reach the counts when ``fold_rollups`` folds their deltas.
+        """
+        filters = OrderRollupFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        params = filters.validated_data
+
+        rollups = OrderRollup.objects.filter(count__gt=0)
+        if "status" in params:
+            rollups = rollups.filter(status=params["status"])
+        if "restaurant" in params:
+            rollups = rollups.filter(restaurant_id=params["restaurant"])
+        if "day_from" in params:
+            rollups = rollups.filter(day__gte=params["day_from"])
+        if "day_to" in params:
+            rollups = rollups.filter(day__lte=params["day_to"])
+
+        serializer = OrderRollupSerializer(rollups.order_by("day", "restaurant_id", "status"), many=True)
 
         return Response(serializer.data)
 
+    @action(methods=["get"], detail=False, url_path="orders/export")
+    def export_orders(self, request: Request) -> StreamingHttpResponse:
+        """Stream the filtered orders with their items, ``?output=ndjson|csv``"""
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORTS:
+            raise ValidationError({"output": f"Choose one of {sorted(EXPORTS)}"})
+
+        export, content_type = EXPORTS[output]
+        rows = export(self.filter_orders(request))
+        response = StreamingHttpResponse(
+            aiterate(rows) if isinstance(request._request, ASGIRequest) else rows,
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="orders.{output}"'
+
+        return response
+
     @action(methods=["post"], detail=False, url_path="webhooks/kfc/")
     def kfc_webhook(self, request: Request):
         data = request.data
         return
 
 @csrf_exempt
+@require_POST
 def kfc_webhook(request):
-
-    print("KFC webhook is handled")
-
-    data: dict = json.loads(request.POST)
-
-    cache = CacheService()
-    restaurant = Restaurant.objects.get(name="KFC")
-    kfc_cache_order = cache.get("kfc_orders", key=data["id"])
-
-    order: Order = Order.objects.get(id=kfc_cache_order["internal_order_id"])
-    tracking_order = TrackingOrder(
-        **cache.get(namespace="orders", key=str(order.pk))
-    )
-    tracking_order.restaurants[str(restaurant.pk)] = {
-        "external_id": data["id"],
-        "status": OrderStatus.COOKED,
-    }
-
-    cache.set(namespace="orders", key=str(order.pk), value=asdict(tracking_order))
-
-    if all_orders_cooked(order.pk):
-        order.status = OrderStatus.COOKED
-        order.save()
-        print(f"All orders are cooked")
+    """
+    Accept one event, a list of events or ``{"events": [...]}``.
+
+    Events are only validated and appended to the ``webhooks:kfc`` stream
+    here, ``consume_kfc_events`` applies them in batches.
+    """
+    if request.content_type == "application/json":
+        try:
+            payload = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({"message": "Invalid JSON"}, status=400)
     else:
-        print(f"Not all orders are cooked")
-
-    return JsonResponse({"message": "ok"})
+        payload = request.POST.dict()
+
+    if isinstance(payload, dict):
+        payload = payload.get("events", [payload])
+
+    serializer = KFCOrderSerializer(data=payload, many=True)
+    if not serializer.is_valid():
+        return JsonResponse({"errors": serializer.errors}, status=400, safe=False)
+
+    enqueue_kfc_events(serializer.validated_data)
+
+    return JsonResponse({"accepted": len(serializer.validated_data)}, status=202)
+
+@staff_member_required
+@require_POST
+def import_dishes(request):
+    """
+    Upsert dishes from the CSV posted by the dish changelist.
+
+    Small files are imported right away, larger ones are handed to the
+    ``import_dishes_file`` task, whose progress is served by
+    ``import_dishes_status``.
+    """
+    upload = request.FILES.get("file")
+    if upload is None:
+        messages.error(request, "Choose a CSV file to import")
+        return redirect("admin:food_dish_changelist")
+
+    if upload.size > settings.DISH_IMPORT_SYNC_MAX_BYTES:
+        job_id = importer.schedule_import(upload)
+        messages.info(
+            request,
+            f"Import {job_id} is queued, progress: "
+            f"{request.build_absolute_uri(f'{job_id}/')}",
+        )
+        return redirect("admin:food_dish_changelist")
+
+    report = importer.import_dishes(upload)
+    messages.success(request, f"{report.imported} dishes imported, {report.skipped} rows skipped")
+    for error in report.errors:
+        messages.warning(request, error)
+
+    return redirect("admin:food_dish_changelist")
+
+@staff_member_required
+def import_dishes_status(request, job_id: str):
+    progress = importer.get_progress(job_id)
+    if progress is None:
+        return JsonResponse({"message": "Import not found"}, status=404)
+
+    return JsonResponse(progress)
+
+async def order_events(request, id: int):
+    """
+    Server-sent events with the status of an order and of its restaurants.
+
+    The first event is the current state, then changes are pushed as they
+    happen (see ``food.events``). Connections are long-lived, so this view
+    needs the ASGI application the Dockerfile serves: under WSGI every
+    connection would hold a worker thread.
+    """
+    try:
+        authenticated = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as error:
+        return JsonResponse({"message": str(error.detail)}, status=401)
+
+    if authenticated is None:
+        return JsonResponse({"message": "Authentication credentials were not provided"}, status=401)
+
+    user, _ = authenticated
+    order = await Order.objects.filter(id=id).afirst()
+
+    if order is None or (order.user_id != user.pk and user.role != Role.ADMIN):
+        return JsonResponse({"message": "Order not found"}, status=404)
+
+    try:
+        # subscribe before reading the state, so no change falls in between
+        queue = await events.hub.subscribe(order.pk)
+    except RedisError as error:
+        print(f"Order events are not available: {error}")
+        return JsonResponse({"message": "Order events are not available"}, status=503)
+
+    stream = None
+    try:
+        tracking_order = await TrackingOrder.aload(order.pk)
+        state = {
+            "order": order.pk,
+            "status": order.status,
+            "restaurants": {
+                restaurant_id: entry.get("status")
+                for restaurant_id, entry in tracking_order.restaurants.items()
+            },
+        }
+        stream = events.stream(order.pk, state, queue)
+    except RedisError as error:
+        print(f"Order events are not available: {error}")
+        return JsonResponse({"message": "Order events are not available"}, status=503)
+    finally:
+        # from here on the stream unsubscribes when the client goes away
+        if stream is None:
+            await events.hub.unsubscribe(order.pk, queue)
+
+    return StreamingHttpResponse(
+        stream,
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 router = routers.DefaultRouter()
 router.register(
@@ -0,0 +1,181 @@
+import time
+
+from django.conf import settings
+
+from shared.cache import CacheService
+from . import events, state
+from .enums import OrderStatus
+from .providers import get_provider
+from .restaurants import restaurants
+from .tracking import TrackingOrder
+
+KFC_STREAM = ("webhooks", "kfc")
+KFC_GROUP = "kfc-consumers"
+
+
+def enqueue_kfc_events(payloads: list[dict], cache: CacheService | None = None) -> list[str]:
+    """Durably accept validated KFC webhook events for the consumer group"""
+    namespace, key = KFC_STREAM
+
+    return (cache or CacheService()).append_events(
+        namespace=namespace,
+        key=key,
+        events=payloads,
+        maxlen=getattr(settings, "KFC_WEBHOOK_STREAM_MAXLEN", None),
+    )
+
+
+class KFCEventConsumer:
+    """
+    Apply KFC webhook events in batches.
+
+    One batch costs a handful of round-trips no matter its size: one MGET
+    for the reverse id mappings, one pipeline of status scripts, at most
+    two status transitions and one XACK.
+
+    A webhook may arrive before ``place_order`` wrote the mapping of its
+    order. Such events stay pending and are replayed every
+    ``retry_delay`` seconds, later events of the same order wait behind
+    them so statuses are applied in order. Events still unknown after
+    ``mapping_wait`` ms are dropped.
+    """
+
+    def __init__(
+        self,
+        consumer: str,
+        batch_size: int = 500,
+        block: int = 1000,
+        claim_idle: int = 60_000,
+        retry_delay: float = 1.0,
+        mapping_wait: int = 300_000,
+    ):
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.block = block
+        self.claim_idle = claim_idle
+        self.retry_delay = retry_delay
+        self.mapping_wait = mapping_wait
+        self.cache = CacheService()
+        self.provider = get_provider("kfc")
+        # external ids with an event left pending, newer events wait for it
+        self.held: set[str] = set()
+
+    def claim(self) -> int:
+        """Take over events another (crashed) consumer left unacknowledged for ``claim_idle`` ms"""
+        namespace, key = KFC_STREAM
+        claimed = self.cache.claim_events(
+            namespace, key, KFC_GROUP, self.consumer, self.claim_idle, self.batch_size
+        )
+
+        if claimed:
+            print(f"Claimed {claimed} stale KFC events")
+
+        return claimed
+
+    def replay(self) -> int:
+        """Process the unacknowledged events of this consumer again, oldest first"""
+        namespace, key = KFC_STREAM
+        after, replayed = "0", 0
+        self.held.clear()
+
+        while batch := self.cache.read_events(
+            namespace,
+            key,
+            group=KFC_GROUP,
+            consumer=self.consumer,
+            count=self.batch_size,
+            pending=True,
+            after=after,
+        ):
+            self.process(batch)
+            after, replayed = batch[-1][0], replayed + len(batch)
+
+        return replayed
+
+    def run(self):
+        namespace, key = KFC_STREAM
+        self.cache.create_group(namespace, key, KFC_GROUP)
+
+        # the first pass replays the events delivered to this consumer
+        # before a crash and the ones claimed from consumers that are gone
+        claimed_at = replayed_at = float("-inf")
+        while True:
+            try:
+                if time.monotonic() - claimed_at >= self.claim_idle / 1000:
+                    self.claim()
+                    claimed_at = time.monotonic()
+
+                if time.monotonic() - replayed_at >= self.retry_delay:
+                    self.replay()
+                    replayed_at = time.monotonic()
+
+                batch = self.cache.read_events(
+                    namespace,
+                    key,
+                    group=KFC_GROUP,
+                    consumer=self.consumer,
+                    count=self.batch_size,
+                    block=self.block,
+                )
+
+                if batch:
+                    self.process(batch)
+            except Exception as error:
+                print(f"KFC event consumer failed: {error!r}")
+                time.sleep(self.retry_delay)
+
+    def process(self, batch: list[tuple[str, dict | None]]):
+        namespace, key = KFC_STREAM
+        restaurant = restaurants.get(name=self.provider.restaurant_name)
+
+        external_ids = list({payload["id"] for _, payload in batch if payload})
+        mappings = self.cache.get_many(f"{self.provider.name}_orders", external_ids)
+        now = time.time() * 1000
+
+        updates, acknowledged = [], []
+        for event_id, payload in batch:
+            if payload and (payload["id"] in self.held or payload["id"] not in mappings):
+                # stream ids start with the millisecond the event was added
+                if now - int(event_id.split("-")[0]) < self.mapping_wait:
+                    self.held.add(payload["id"])
+                    continue
+
+                print(f"KFC event {event_id} for unknown order {payload['id']} is dropped")
+            elif payload:
+                updates.append(
+                    (
+                        mappings[payload["id"]]["internal_order_id"],
+                        restaurant.pk,
+                        self.provider.get_internal_status(payload["status"]),
+                    )
+                )
+
+            acknowledged.append(event_id)
+
+        results = TrackingOrder.set_statuses(updates, self.cache)
+
+        cooking, cooked, status_events = set(), set(), []
+        for (order_id, restaurant_id, status), (changed, completed) in zip(updates, results):
+            if changed:
+                status_events.append(events.order_event(order_id, status, restaurant_id))
+            if changed and status == OrderStatus.COOKING:
+                cooking.add(order_id)
+            if completed:
+                cooked.add(order_id)
+
+        cooking = state.transition(cooking - cooked, OrderStatus.COOKING, source="kfc")
+        cooked = state.transition(cooked, OrderStatus.COOKED, source="kfc")
+
+        status_events += [
+            events.order_event(order_id, OrderStatus.COOKING) for order_id in cooking
+        ]
+        status_events += [
+            events.order_event(order_id, OrderStatus.COOKED) for order_id in cooked
+        ]
+        events.publish_events(status_events, self.cache)
+
+        self.cache.ack_events(namespace, key, KFC_GROUP, acknowledged)
+        print(
+            f"Applied {len(updates)} KFC events, {len(cooked)} orders cooked, "
+            f"{len(batch) - len(acknowledged)} waiting for their order"
+        )
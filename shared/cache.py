@@ -1,36 +1,864 @@
+from __future__ import annotations
+
+import asyncio
 import json
-from typing import Any
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterable, Iterator
 
 import redis
+import redis.asyncio
+from django.conf import settings
 
+from .codecs import ValueCodec, get_value_codec
+from .near_cache import CHANNEL as NEAR_CACHE_CHANNEL, get_near_cache, is_near_cached
 
-class CacheService:
-    def __init__(self):
-        self.connection: redis.Redis = redis.Redis.from_url(
-            "redis://localhost:6379/0"
-        )
+# KEYS[1] hash, ARGV: field, expected, expect-missing flag, new value
+COMPARE_AND_SET_FIELD = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if (current == false and ARGV[3] == '1') or current == ARGV[2] then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+# KEYS[1] hash, ARGV: field, new value, target value, counter field.
+# The counter holds how many fields have not reached the target yet.
+SET_FIELD_COUNTED = """
+local previous = redis.call('HGET', KEYS[1], ARGV[1])
+if previous == ARGV[2] then
+    return {0, -1}
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+if ARGV[2] == ARGV[3] then
+    return {1, redis.call('HINCRBY', KEYS[1], ARGV[4], -1)}
+end
+if previous == ARGV[3] then
+    redis.call('HINCRBY', KEYS[1], ARGV[4], 1)
+end
+return {1, -1}
+"""
+
+_pool: redis.ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> redis.ConnectionPool:
+    """
+    Process-wide pool for ``CACHES["default"]["LOCATION"]``.
+
+    redis-py pools reset themselves in forked children, so one lazily
+    created pool is safe for both web and Celery prefork workers.
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = redis.BlockingConnectionPool.from_url(
+                settings.CACHES["default"]["LOCATION"],
+                max_connections=getattr(settings, "CACHE_MAX_CONNECTIONS", 50),
+                timeout=5,
+            )
+
+    return _pool
+
+
+class BaseCacheService:
+    """Key layout, value encoding and near-cache bookkeeping shared by both clients"""
 
     @staticmethod
     def _build_key(namespace: str, key: str) -> str:
         return f"{namespace}:{key}"
 
+    @staticmethod
+    def _encode(namespace: str, value: Any) -> bytes:
+        return get_value_codec(namespace).encode(value)
+
+    @staticmethod
+    def _decode(data: bytes) -> Any:
+        return ValueCodec.decode(data)
+
+    @staticmethod
+    def _drop_near(namespace: str, keys: Iterable[str]) -> list[str]:
+        """Drop keys from this process' near cache, return the messages to broadcast"""
+        if not is_near_cached(namespace):
+            return []
+
+        near_cache = get_near_cache(namespace)
+        messages = []
+
+        for key in dict.fromkeys(keys):
+            if near_cache is not None:
+                near_cache.invalidate(key)
+            messages.append(f"{namespace}:{key}")
+
+        return messages
+
+
+class CacheService(BaseCacheService):
+    def __init__(self, connection: redis.Redis | None = None):
+        self.connection: redis.Redis = connection or redis.Redis(
+            connection_pool=get_connection_pool()
+        )
+
+    def _invalidate(self, namespace: str, keys: Iterable[str], connection=None):
+        """
+        Drop keys from the near caches of every process.
+
+        Must run after the write itself; pass a pipeline as ``connection``
+        to queue the broadcast right behind the queued writes.
+        """
+        publisher = connection if connection is not None else self.connection
+
+        for message in self._drop_near(namespace, keys):
+            publisher.publish(NEAR_CACHE_CHANNEL, message)
+
+    def _get_raw(self, namespace: str, key: str, fetch) -> Any:
+        """Serve ``fetch()`` from the near cache of the namespace if enabled"""
+        near_cache = get_near_cache(namespace)
+
+        if near_cache is None:
+            return fetch()
+
+        hit, result = near_cache.get(key)
+        if hit:
+            return result
+
+        token = near_cache.begin()
+        result = fetch()
+
+        if result:
+            near_cache.set(key, result, token)
+
+        return result
+
     def set(self, namespace: str, key: str, value: dict, ttl: int | None = None):
-        payload: str = json.dumps(value)
+        payload: bytes = self._encode(namespace, value)
         self.connection.set(
             name=self._build_key(namespace, key),
             value=payload,
             ex=ttl
         )
-
+        self._invalidate(namespace, [key])
 
     def get(self, namespace: str, key: str):
-        result: str = self.connection.get(
-            self._build_key(namespace, key)
+        result: bytes | None = self._get_raw(
+            namespace, key, lambda: self.connection.get(self._build_key(namespace, key))
         )
 
-        return json.loads(result)
+        return None if result is None else self._decode(result)
 
     def delete(self, namespace: str, key: str):
         self.connection.delete(
             self._build_key(namespace=namespace, key=key)
-        )
\ No newline at end of file
+        )
+        self._invalidate(namespace, [key])
+
+    def get_many(self, namespace: str, keys: list[str]) -> dict[str, Any]:
+        """Missing keys are left out of the result"""
+        if not keys:
+            return {}
+
+        near_cache = get_near_cache(namespace)
+        found: dict[str, bytes] = {}
+
+        if near_cache is not None:
+            for key in keys:
+                hit, result = near_cache.get(key)
+                if hit:
+                    found[key] = result
+
+            token = near_cache.begin()
+
+        missing = [key for key in keys if key not in found]
+        if missing:
+            results: list[bytes | None] = self.connection.mget(
+                [self._build_key(namespace, key) for key in missing]
+            )
+
+            for key, result in zip(missing, results):
+                if result is None:
+                    continue
+
+                found[key] = result
+                if near_cache is not None:
+                    near_cache.set(key, result, token)
+
+        return {key: self._decode(result) for key, result in found.items()}
+
+    def set_many(self, namespace: str, values: dict[str, Any], ttl: int | None = None):
+        if not values:
+            return
+
+        with self.connection.pipeline(transaction=False) as pipeline:
+            for key, value in values.items():
+                pipeline.set(
+                    name=self._build_key(namespace, key),
+                    value=self._encode(namespace, value),
+                    ex=ttl,
+                )
+            self._invalidate(namespace, values, pipeline)
+            pipeline.execute()
+
+    def delete_many(self, namespace: str, keys: list[str]):
+        if keys:
+            self.connection.delete(*(self._build_key(namespace, key) for key in keys))
+            self._invalidate(namespace, keys)
+
+    @contextmanager
+    def pipeline(self, transaction: bool = True) -> Iterator["CachePipeline"]:
+        """
+        Queue writes and send them in one round-trip when the block exits.
+
+        The yielded ``CachePipeline`` shares the write API but only buffers
+        commands; methods that return a result raise ``TypeError`` there.
+        With ``transaction=True`` the batch is applied as MULTI/EXEC.
+        Nothing is sent if the block raises.
+        """
+        with self.connection.pipeline(transaction=transaction) as pipeline:
+            yield CachePipeline(connection=pipeline)
+            pipeline.execute()
+
+    def add_member(self, namespace: str, key: str, member: str):
+        self.connection.sadd(self._build_key(namespace, key), member)
+
+    def remove_member(self, namespace: str, key: str, member: str):
+        self.connection.srem(self._build_key(namespace, key), member)
+
+    def members(self, namespace: str, key: str) -> set[str]:
+        results: set[bytes] = self.connection.smembers(
+            self._build_key(namespace, key)
+        )
+
+        return {member.decode() for member in results}
+
+    def set_fields(self, namespace: str, key: str, values: dict[str, Any], ttl: int | None = None):
+        """Write only the given hash fields, leaving the others untouched"""
+        name = self._build_key(namespace, key)
+        self.connection.hset(
+            name=name,
+            mapping={
+                field: self._encode(namespace, value) for field, value in values.items()
+            },
+        )
+
+        if ttl is not None:
+            self.connection.expire(name, ttl)
+
+        self._invalidate(namespace, [key])
+
+    def set_field(self, namespace: str, key: str, field: str, value: Any):
+        self.set_fields(namespace, key, {field: value})
+
+    def get_field(self, namespace: str, key: str, field: str):
+        if get_near_cache(namespace) is not None:
+            result = self._get_raw_fields(namespace, key).get(field.encode())
+        else:
+            result: bytes | None = self.connection.hget(
+                self._build_key(namespace, key), field
+            )
+
+        return None if result is None else self._decode(result)
+
+    def _get_raw_fields(self, namespace: str, key: str) -> dict[bytes, bytes]:
+        return self._get_raw(
+            namespace, key, lambda: self.connection.hgetall(self._build_key(namespace, key))
+        )
+
+    def get_fields(self, namespace: str, key: str) -> dict[str, Any]:
+        results: dict[bytes, bytes] = self._get_raw_fields(namespace, key)
+
+        return {field.decode(): self._decode(value) for field, value in results.items()}
+
+    def compare_and_set_field(
+        self, namespace: str, key: str, field: str, expected: Any, value: Any
+    ) -> bool:
+        """
+        Atomically replace a hash field only if it still holds ``expected``.
+
+        ``expected=None`` means the field must not exist yet.
+        """
+        script = self.connection.register_script(COMPARE_AND_SET_FIELD)
+        result = script(
+            keys=[self._build_key(namespace, key)],
+            args=[
+                field,
+                "" if expected is None else self._encode(namespace, expected),
+                "1" if expected is None else "0",
+                self._encode(namespace, value),
+            ],
+        )
+
+        if result:
+            self._invalidate(namespace, [key])
+
+        return bool(result)
+
+    def set_field_counted(
+        self, namespace: str, key: str, field: str, value: Any, counter: str, target: Any
+    ) -> tuple[bool, int | None]:
+        """
+        Set a hash field and keep ``counter`` in sync in one atomic step.
+
+        ``counter`` counts the fields that have not reached ``target`` yet.
+        Returns whether the field changed and, if this call moved it to
+        ``target``, the counter value left afterwards.
+        """
+        [result] = self.set_fields_counted(
+            namespace, [(key, field, value)], counter=counter, target=target
+        )
+
+        return result
+
+    def set_fields_counted(
+        self, namespace: str, updates: list[tuple[str, str, Any]], counter: str, target: Any
+    ) -> list[tuple[bool, int | None]]:
+        """Pipelined ``set_field_counted`` for ``(key, field, value)`` updates"""
+        script = self.connection.register_script(SET_FIELD_COUNTED)
+
+        with self.connection.pipeline(transaction=False) as pipeline:
+            for key, field, value in updates:
+                script(
+                    keys=[self._build_key(namespace, key)],
+                    args=[
+                        field,
+                        self._encode(namespace, value),
+                        self._encode(namespace, target),
+                        counter,
+                    ],
+                    client=pipeline,
+                )
+            self._invalidate(namespace, [key for key, _, _ in updates], pipeline)
+            results = pipeline.execute()[:len(updates)]
+
+        return [
+            (bool(changed), None if remaining < 0 else remaining)
+            for changed, remaining in results
+        ]
+
+    def add_positions(self, namespace: str, key: str, positions: dict[str, tuple[float, float]]):
+        """Set the ``(latitude, longitude)`` of members of a Redis GEO set"""
+        if positions:
+            self.connection.geoadd(
+                self._build_key(namespace, key),
+                [
+                    value
+                    for member, (latitude, longitude) in positions.items()
+                    for value in (longitude, latitude, member)
+                ],
+            )
+
+    def remove_positions(self, namespace: str, key: str, members: list[str]):
+        if members:
+            self.connection.zrem(self._build_key(namespace, key), *members)
+
+    def get_positions(self, namespace: str, key: str, members: list[str]) -> dict[str, tuple[float, float]]:
+        """Missing members are left out of the result"""
+        if not members:
+            return {}
+
+        results = self.connection.geopos(self._build_key(namespace, key), *members)
+
+        return {
+            member: (position[1], position[0])
+            for member, position in zip(members, results)
+            if position is not None
+        }
+
+    def search_positions(
+        self, namespace: str, key: str, latitude: float, longitude: float, radius_km: float, count: int
+    ) -> list[tuple[str, float, tuple[float, float]]]:
+        """``(member, distance km, (latitude, longitude))`` within the radius, nearest first"""
+        results = self.connection.geosearch(
+            self._build_key(namespace, key),
+            longitude=longitude,
+            latitude=latitude,
+            radius=radius_km,
+            unit="km",
+            sort="ASC",
+            count=count,
+            withdist=True,
+            withcoord=True,
+        )
+
+        return [
+            (member.decode(), distance, (position[1], position[0]))
+            for member, distance, position in results
+        ]
+
+    def push_recent(self, namespace: str, key: str, value: bytes, size: int, ttl: int | None = None):
+        """Prepend a raw value to a list capped at ``size`` entries, newest first"""
+        name = self._build_key(namespace, key)
+
+        self.connection.lpush(name, value)
+        self.connection.ltrim(name, 0, size - 1)
+
+        if ttl is not None:
+            self.connection.expire(name, ttl)
+
+    def recent(self, namespace: str, key: str, count: int) -> list[bytes]:
+        return self.connection.lrange(self._build_key(namespace, key), 0, count - 1)
+
+    def append_chunks(self, namespace: str, key: str, chunks: Iterable[bytes], ttl: int | None = None):
+        """Store raw data too large for one value as a list of chunks, one round-trip per chunk"""
+        name = self._build_key(namespace, key)
+
+        for chunk in chunks:
+            self.connection.rpush(name, chunk)
+
+        if ttl is not None:
+            self.connection.expire(name, ttl)
+
+    def chunks(self, namespace: str, key: str) -> Iterator[bytes]:
+        """Read ``append_chunks`` data back one chunk at a time"""
+        name = self._build_key(namespace, key)
+        index = 0
+
+        while (chunk := self.connection.lindex(name, index)) is not None:
+            yield chunk
+            index += 1
+
+    def append_events(
+        self, namespace: str, key: str, events: list[dict], maxlen: int | None = None
+    ) -> list[str]:
+        """Append events to a Redis stream in one round-trip"""
+        name = self._build_key(namespace, key)
+
+        with self.connection.pipeline(transaction=False) as pipeline:
+            for event in events:
+                pipeline.xadd(
+                    name, {"data": json.dumps(event)}, maxlen=maxlen, approximate=True
+                )
+            results: list[bytes] = pipeline.execute()
+
+        return [event_id.decode() for event_id in results]
+
+    def create_group(self, namespace: str, key: str, group: str):
+        try:
+            self.connection.xgroup_create(
+                self._build_key(namespace, key), group, id="0", mkstream=True
+            )
+        except redis.ResponseError as error:
+            if "BUSYGROUP" not in str(error):
+                raise
+
+    def read_events(
+        self,
+        namespace: str,
+        key: str,
+        group: str,
+        consumer: str,
+        count: int = 100,
+        block: int | None = None,
+        pending: bool = False,
+        after: str = "0",
+    ) -> list[tuple[str, dict | None]]:
+        """
+        Read a batch for a consumer group member.
+
+        With ``pending=True`` the consumer's own delivered but not acknowledged
+        events with ids above ``after`` are returned instead of new ones (used
+        for crash recovery and retries). Trimmed events come back as ``None``
+        payloads.
+        """
+        response = self.connection.xreadgroup(
+            group,
+            consumer,
+            {self._build_key(namespace, key): after if pending else ">"},
+            count=count,
+            block=block,
+        )
+
+        return [
+            (
+                event_id.decode(),
+                json.loads(fields[b"data"]) if fields else None,
+            )
+            for _, events in response
+            for event_id, fields in events
+        ]
+
+    def ack_events(self, namespace: str, key: str, group: str, event_ids: list[str]):
+        if event_ids:
+            self.connection.xack(self._build_key(namespace, key), group, *event_ids)
+
+    def claim_events(
+        self, namespace: str, key: str, group: str, consumer: str, min_idle: int, count: int = 100
+    ) -> int:
+        """
+        Move events unacknowledged for ``min_idle`` ms from any group member to ``consumer``.
+
+        Claimed events are read back with ``read_events(pending=True)``.
+        Returns how many events were claimed.
+        """
+        name = self._build_key(namespace, key)
+        cursor, claimed = "0-0", 0
+
+        while True:
+            cursor, events, *_ = self.connection.xautoclaim(
+                name, group, consumer, min_idle, start_id=cursor, count=count
+            )
+            claimed += len(events)
+
+            if cursor in (b"0-0", "0-0"):
+                return claimed
+
+
+# methods whose result only exists once a pipeline has been executed
+RESULT_METHODS = (
+    "get",
+    "get_many",
+    "members",
+    "get_field",
+    "get_fields",
+    "compare_and_set_field",
+    "set_field_counted",
+    "set_fields_counted",
+    "get_positions",
+    "search_positions",
+    "recent",
+    "chunks",
+    "append_events",
+    "read_events",
+    "claim_events",
+)
+
+
+def _result_method(name: str):
+    def method(self, *args, **kwargs):
+        raise TypeError(f"{name}() returns a result, call it outside of the pipeline")
+
+    method.__name__ = name
+    return method
+
+
+class CachePipeline(CacheService):
+    """``CacheService`` bound to a pipeline, see ``CacheService.pipeline``"""
+
+
+for _name in RESULT_METHODS:
+    setattr(CachePipeline, _name, _result_method(_name))
+
+
+_async_pools: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_async_connection_pool() -> redis.asyncio.ConnectionPool:
+    """Shared pool of the running event loop (async connections are loop-bound)"""
+    loop = asyncio.get_running_loop()
+
+    if loop not in _async_pools:
+        _async_pools[loop] = redis.asyncio.BlockingConnectionPool.from_url(
+            settings.CACHES["default"]["LOCATION"],
+            max_connections=getattr(settings, "CACHE_MAX_CONNECTIONS", 50),
+            timeout=5,
+        )
+
+    return _async_pools[loop]
+
+
+class AsyncCacheService(BaseCacheService):
+    """
+    Non-blocking ``CacheService`` for ASGI views and event-loop workers.
+
+    Keys, encoding, Lua scripts and near-cache invalidation are shared with
+    ``CacheService``, so values written by one are read back unchanged by
+    the other.
+    """
+
+    def __init__(self, connection: redis.asyncio.Redis | None = None):
+        self.connection: redis.asyncio.Redis = connection or redis.asyncio.Redis(
+            connection_pool=get_async_connection_pool()
+        )
+
+    async def _invalidate(self, namespace: str, keys: Iterable[str], connection=None):
+        publisher = connection if connection is not None else self.connection
+
+        for message in self._drop_near(namespace, keys):
+            if connection is not None:
+                publisher.publish(NEAR_CACHE_CHANNEL, message)
+            else:
+                await publisher.publish(NEAR_CACHE_CHANNEL, message)
+
+    async def _get_raw(self, namespace: str, key: str, fetch) -> Any:
+        near_cache = get_near_cache(namespace)
+
+        if near_cache is None:
+            return await fetch()
+
+        hit, result = near_cache.get(key)
+        if hit:
+            return result
+
+        token = near_cache.begin()
+        result = await fetch()
+
+        if result:
+            near_cache.set(key, result, token)
+
+        return result
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: int | None = None):
+        await self.connection.set(
+            name=self._build_key(namespace, key),
+            value=self._encode(namespace, value),
+            ex=ttl,
+        )
+        await self._invalidate(namespace, [key])
+
+    async def get(self, namespace: str, key: str):
+        result: bytes | None = await self._get_raw(
+            namespace, key, lambda: self.connection.get(self._build_key(namespace, key))
+        )
+
+        return None if result is None else self._decode(result)
+
+    async def delete(self, namespace: str, key: str):
+        await self.connection.delete(self._build_key(namespace, key))
+        await self._invalidate(namespace, [key])
+
+    async def get_many(self, namespace: str, keys: list[str]) -> dict[str, Any]:
+        """Missing keys are left out of the result"""
+        if not keys:
+            return {}
+
+        near_cache = get_near_cache(namespace)
+        found: dict[str, bytes] = {}
+
+        if near_cache is not None:
+            for key in keys:
+                hit, result = near_cache.get(key)
+                if hit:
+                    found[key] = result
+
+            token = near_cache.begin()
+
+        missing = [key for key in keys if key not in found]
+        if missing:
+            results: list[bytes | None] = await self.connection.mget(
+                [self._build_key(namespace, key) for key in missing]
+            )
+
+            for key, result in zip(missing, results):
+                if result is None:
+                    continue
+
+                found[key] = result
+                if near_cache is not None:
+                    near_cache.set(key, result, token)
+
+        return {key: self._decode(result) for key, result in found.items()}
+
+    async def set_many(self, namespace: str, values: dict[str, Any], ttl: int | None = None):
+        if not values:
+            return
+
+        async with self.connection.pipeline(transaction=False) as pipeline:
+            for key, value in values.items():
+                pipeline.set(
+                    name=self._build_key(namespace, key),
+                    value=self._encode(namespace, value),
+                    ex=ttl,
+                )
+            await self._invalidate(namespace, values, pipeline)
+            await pipeline.execute()
+
+    async def delete_many(self, namespace: str, keys: list[str]):
+        if keys:
+            await self.connection.delete(*(self._build_key(namespace, key) for key in keys))
+            await self._invalidate(namespace, keys)
+
+    async def add_member(self, namespace: str, key: str, member: str):
+        await self.connection.sadd(self._build_key(namespace, key), member)
+
+    async def remove_member(self, namespace: str, key: str, member: str):
+        await self.connection.srem(self._build_key(namespace, key), member)
+
+    async def members(self, namespace: str, key: str) -> set[str]:
+        results: set[bytes] = await self.connection.smembers(
+            self._build_key(namespace, key)
+        )
+
+        return {member.decode() for member in results}
+
+    async def set_fields(self, namespace: str, key: str, values: dict[str, Any], ttl: int | None = None):
+        """Write only the given hash fields, leaving the others untouched"""
+        name = self._build_key(namespace, key)
+        await self.connection.hset(
+            name=name,
+            mapping={
+                field: self._encode(namespace, value) for field, value in values.items()
+            },
+        )
+
+        if ttl is not None:
+            await self.connection.expire(name, ttl)
+
+        await self._invalidate(namespace, [key])
+
+    async def set_field(self, namespace: str, key: str, field: str, value: Any):
+        await self.set_fields(namespace, key, {field: value})
+
+    async def _get_raw_fields(self, namespace: str, key: str) -> dict[bytes, bytes]:
+        return await self._get_raw(
+            namespace, key, lambda: self.connection.hgetall(self._build_key(namespace, key))
+        )
+
+    async def get_field(self, namespace: str, key: str, field: str):
+        if get_near_cache(namespace) is not None:
+            fields = await self._get_raw_fields(namespace, key)
+            result = fields.get(field.encode())
+        else:
+            result: bytes | None = await self.connection.hget(
+                self._build_key(namespace, key), field
+            )
+
+        return None if result is None else self._decode(result)
+
+    async def get_fields(self, namespace: str, key: str) -> dict[str, Any]:
+        results: dict[bytes, bytes] = await self._get_raw_fields(namespace, key)
+
+        return {field.decode(): self._decode(value) for field, value in results.items()}
+
+    async def compare_and_set_field(
+        self, namespace: str, key: str, field: str, expected: Any, value: Any
+    ) -> bool:
+        """Atomically replace a hash field only if it still holds ``expected``"""
+        script = self.connection.register_script(COMPARE_AND_SET_FIELD)
+        result = await script(
+            keys=[self._build_key(namespace, key)],
+            args=[
+                field,
+                "" if expected is None else self._encode(namespace, expected),
+                "1" if expected is None else "0",
+                self._encode(namespace, value),
+            ],
+        )
+
+        if result:
+            await self._invalidate(namespace, [key])
+
+        return bool(result)
+
+    async def set_field_counted(
+        self, namespace: str, key: str, field: str, value: Any, counter: str, target: Any
+    ) -> tuple[bool, int | None]:
+        [result] = await self.set_fields_counted(
+            namespace, [(key, field, value)], counter=counter, target=target
+        )
+
+        return result
+
+    async def set_fields_counted(
+        self, namespace: str, updates: list[tuple[str, str, Any]], counter: str, target: Any
+    ) -> list[tuple[bool, int | None]]:
+        """Pipelined ``set_field_counted`` for ``(key, field, value)`` updates"""
+        script = self.connection.register_script(SET_FIELD_COUNTED)
+
+        async with self.connection.pipeline(transaction=False) as pipeline:
+            for key, field, value in updates:
+                await script(
+                    keys=[self._build_key(namespace, key)],
+                    args=[
+                        field,
+                        self._encode(namespace, value),
+                        self._encode(namespace, target),
+                        counter,
+                    ],
+                    client=pipeline,
+                )
+            await self._invalidate(namespace, [key for key, _, _ in updates], pipeline)
+            results = (await pipeline.execute())[:len(updates)]
+
+        return [
+            (bool(changed), None if remaining < 0 else remaining)
+            for changed, remaining in results
+        ]
+
+    async def add_positions(self, namespace: str, key: str, positions: dict[str, tuple[float, float]]):
+        """Set the ``(latitude, longitude)`` of members of a Redis GEO set"""
+        if positions:
+            await self.connection.geoadd(
+                self._build_key(namespace, key),
+                [
+                    value
+                    for member, (latitude, longitude) in positions.items()
+                    for value in (longitude, latitude, member)
+                ],
+            )
+
+    async def remove_positions(self, namespace: str, key: str, members: list[str]):
+        if members:
+            await self.connection.zrem(self._build_key(namespace, key), *members)
+
+    async def get_positions(
+        self, namespace: str, key: str, members: list[str]
+    ) -> dict[str, tuple[float, float]]:
+        """Missing members are left out of the result"""
+        if not members:
+            return {}
+
+        results = await self.connection.geopos(self._build_key(namespace, key), *members)
+
+        return {
+            member: (position[1], position[0])
+            for member, position in zip(members, results)
+            if position is not None
+        }
+
+    async def search_positions(
+        self, namespace: str, key: str, latitude: float, longitude: float, radius_km: float, count: int
+    ) -> list[tuple[str, float, tuple[float, float]]]:
+        """``(member, distance km, (latitude, longitude))`` within the radius, nearest first"""
+        results = await self.connection.geosearch(
+            self._build_key(namespace, key),
+            longitude=longitude,
+            latitude=latitude,
+            radius=radius_km,
+            unit="km",
+            sort="ASC",
+            count=count,
+            withdist=True,
+            withcoord=True,
+        )
+
+        return [
+            (member.decode(), distance, (position[1], position[0]))
+            for member, distance, position in results
+        ]
+
+    async def push_recent(self, namespace: str, key: str, value: bytes, size: int, ttl: int | None = None):
+        """Prepend a raw value to a list capped at ``size`` entries, newest first"""
+        name = self._build_key(namespace, key)
+
+        await self.connection.lpush(name, value)
+        await self.connection.ltrim(name, 0, size - 1)
+
+        if ttl is not None:
+            await self.connection.expire(name, ttl)
+
+    async def recent(self, namespace: str, key: str, count: int) -> list[bytes]:
+        return await self.connection.lrange(self._build_key(namespace, key), 0, count - 1)
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = True) -> AsyncIterator["AsyncCachePipeline"]:
+        """
+        Queue writes and send them in one round-trip when the block exits.
+
+        The yielded ``AsyncCachePipeline`` keeps the async API, awaiting its
+        write methods only buffers the commands. As with the synchronous
+        pipeline, methods that return a result raise ``TypeError``.
+        """
+        async with self.connection.pipeline(transaction=transaction) as pipeline:
+            yield AsyncCachePipeline(connection=pipeline)
+            await pipeline.execute()
+
+
+class AsyncCachePipeline(AsyncCacheService):
+    """``AsyncCacheService`` bound to a pipeline, see ``AsyncCacheService.pipeline``"""
+
+
+for _name in RESULT_METHODS:
+    setattr(AsyncCachePipeline, _name, _result_method(_name))
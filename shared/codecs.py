@@ -0,0 +1,155 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import lz4.frame as lz4
+except ImportError:  # pragma: no cover - optional dependency
+    lz4 = None
+
+# Encoded values start with MAGIC + codec id + compression id. JSON text
+# never starts with 0xC5, so values written before the header existed are
+# still read as plain JSON.
+MAGIC = b"\xc5\x01"
+HEADER_SIZE = len(MAGIC) + 2
+
+SCALARS = (str, int, float, bool, type(None))
+
+
+@dataclass(frozen=True)
+class Codec:
+    id: int
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+@dataclass(frozen=True)
+class Compressor:
+    id: int
+    name: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+CODECS: dict[str, Codec] = {
+    "json": Codec(1, "json", _json_dumps, json.loads),
+}
+if orjson is not None:
+    CODECS["orjson"] = Codec(2, "orjson", orjson.dumps, orjson.loads)
+if msgpack is not None:
+    CODECS["msgpack"] = Codec(
+        3,
+        "msgpack",
+        lambda value: msgpack.packb(value, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+    )
+
+COMPRESSORS: dict[str, Compressor] = {
+    "none": Compressor(0, "none", bytes, bytes),
+}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = Compressor(
+        1,
+        "zstd",
+        lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+if lz4 is not None:
+    COMPRESSORS["lz4"] = Compressor(2, "lz4", lz4.compress, lz4.decompress)
+
+CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+COMPRESSORS_BY_ID = {compressor.id: compressor for compressor in COMPRESSORS.values()}
+
+
+@dataclass(frozen=True)
+class ValueCodec:
+    """
+    Encoding of one cache namespace.
+
+    Containers are written as ``header + (compressed) payload``, compressed
+    only when the payload reaches ``threshold`` bytes. Scalars are always
+    stored as plain JSON: they are tiny, and Lua scripts compare them
+    byte-wise, so their encoding must not depend on the namespace settings.
+    Any header can be decoded regardless of the configured codec, which
+    allows switching codecs without flushing Redis.
+    """
+
+    codec: Codec
+    compressor: Compressor
+    threshold: int = 1024
+
+    def encode(self, value: Any) -> bytes:
+        if isinstance(value, SCALARS):
+            return _json_dumps(value)
+
+        payload = self.codec.dumps(value)
+        compressor = COMPRESSORS["none"]
+
+        if self.compressor.id and len(payload) >= self.threshold:
+            payload, compressor = self.compressor.compress(payload), self.compressor
+
+        return MAGIC + bytes((self.codec.id, compressor.id)) + payload
+
+    @staticmethod
+    def decode(data: bytes) -> Any:
+        if not data.startswith(MAGIC):
+            return json.loads(data)
+
+        codec_id, compressor_id = data[len(MAGIC)], data[len(MAGIC) + 1]
+
+        try:
+            codec = CODECS_BY_ID[codec_id]
+            compressor = COMPRESSORS_BY_ID[compressor_id]
+        except KeyError:
+            raise ValueError(
+                f"Cache value encoded with codec {codec_id}/compression {compressor_id} "
+                f"that is not installed in this process"
+            )
+
+        return codec.loads(compressor.decompress(data[HEADER_SIZE:]))
+
+
+def build_value_codec(codec: str = "json", compression: str = "none", threshold: int = 1024) -> ValueCodec:
+    try:
+        return ValueCodec(CODECS[codec], COMPRESSORS[compression or "none"], threshold)
+    except KeyError as error:
+        raise ImproperlyConfigured(
+            f"Cache codec {codec}/{compression} is unknown or its package is not installed"
+        ) from error
+
+
+_value_codecs: dict[str, ValueCodec] = {}
+
+
+def get_value_codec(namespace: str) -> ValueCodec:
+    """``CACHE_CODECS[namespace]`` merged over ``CACHE_CODECS["default"]``"""
+    if namespace not in _value_codecs:
+        configs: dict = getattr(settings, "CACHE_CODECS", {})
+        _value_codecs[namespace] = build_value_codec(
+            **{**configs.get("default", {}), **configs.get(namespace, {})}
+        )
+
+    return _value_codecs[namespace]
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from typing import Callable
+
+import redis
+
+from .cache import CacheService
+
+Callback = Callable[[str], None]
+
+
+class InvalidationBus:
+    """
+    Broadcast invalidation messages to every process over Redis pub/sub.
+
+    Each process runs a single daemon listener thread (restarted after a
+    fork) that dispatches messages to the callbacks subscribed to the
+    channel. When the listener loses its connection every callback is
+    called with an empty message: messages may have been missed, so the
+    subscribers should drop everything they hold.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks: dict[str, list[Callback]] = {}
+        self._pubsub: redis.client.PubSub | None = None
+        self._subscribed: set[str] = set()
+        self._thread = None
+        self._pid: int | None = None
+
+    def publish(self, channel: str, message: str = ""):
+        CacheService().connection.publish(channel, message)
+
+    def subscribe(self, channel: str, callback: Callback) -> bool:
+        """Register a callback; returns False when Redis is unreachable"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pubsub, self._thread = None, None
+                self._subscribed = set()
+                self._pid = os.getpid()
+
+            try:
+                if self._pubsub is None:
+                    self._pubsub = CacheService().connection.pubsub(
+                        ignore_subscribe_messages=True
+                    )
+
+                if channel not in self._callbacks:
+                    self._callbacks[channel] = []
+
+                if channel not in self._subscribed:
+                    self._pubsub.subscribe(**{channel: self._dispatch})
+                    self._subscribed.add(channel)
+
+                if self._thread is None:
+                    self._thread = self._pubsub.run_in_thread(
+                        sleep_time=1.0,
+                        daemon=True,
+                        exception_handler=self._handle_error,
+                    )
+            except redis.RedisError as error:
+                print(f"Invalidation bus is not available: {error}")
+                return False
+
+            if callback not in self._callbacks[channel]:
+                self._callbacks[channel].append(callback)
+
+        return True
+
+    def _dispatch(self, message: dict):
+        channel = message["channel"].decode()
+        data = message["data"]
+
+        for callback in self._callbacks.get(channel, []):
+            callback(data.decode() if isinstance(data, bytes) else str(data))
+
+    def _handle_error(self, error: Exception, pubsub, thread):
+        print(f"Invalidation listener failed: {error}")
+
+        for callbacks in self._callbacks.values():
+            for callback in callbacks:
+                callback("")
+
+        time.sleep(1.0)
+
+
+bus = InvalidationBus()
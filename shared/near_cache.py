@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from django.conf import settings
+
+CHANNEL = "cache:invalidate"
+
+
+class NearCache:
+    """
+    Bounded in-process LRU with a TTL in front of one Redis namespace.
+
+    Entries hold the raw Redis payloads, so every hit decodes a private
+    copy and callers can not mutate each other's values.
+
+    Writers invalidate keys through the ``cache:invalidate`` channel.
+    A value read from Redis is only stored if no invalidation arrived
+    while it was being fetched (see ``begin``), so a late reader can not
+    put back a value that was already replaced.
+    """
+
+    def __init__(self, namespace: str, size: int, ttl: float):
+        self.namespace = namespace
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def begin(self) -> int:
+        """Token to pass to ``set`` for a value about to be read from Redis"""
+        return self._invalidations
+
+    def set(self, key: str, value: Any, token: int):
+        with self._lock:
+            if token != self._invalidations:
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str | None = None):
+        """Drop one key, or everything when ``key`` is None"""
+        with self._lock:
+            self._invalidations += 1
+
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self._invalidations,
+            }
+
+
+NEAR_CACHES: dict[str, NearCache | None] = {}
+_lock = threading.Lock()
+_pid: int | None = None
+
+
+def _on_invalidate(message: str):
+    if not message:
+        # the listener reconnected and may have missed messages
+        for near_cache in NEAR_CACHES.values():
+            if near_cache is not None:
+                near_cache.invalidate()
+        return
+
+    namespace, key = message.split(":", 1)
+    near_cache = NEAR_CACHES.get(namespace)
+
+    if near_cache is not None:
+        near_cache.invalidate(key)
+
+
+def _reset_after_fork():
+    """A forked child must resubscribe before trusting inherited entries"""
+    global _pid
+
+    if _pid != os.getpid():
+        NEAR_CACHES.clear()
+        _pid = os.getpid()
+
+
+def is_near_cached(namespace: str) -> bool:
+    """Whether writers must broadcast invalidations for the namespace"""
+    return namespace in getattr(settings, "CACHE_NEAR", {})
+
+
+def get_near_cache(namespace: str) -> NearCache | None:
+    """
+    Near cache of a namespace listed in ``CACHE_NEAR``, if any.
+
+    Disabled (None) when the invalidation channel is unreachable, since
+    the process could not learn about writes made elsewhere.
+    """
+    if _pid == os.getpid() and namespace in NEAR_CACHES:
+        return NEAR_CACHES[namespace]
+
+    from .invalidation import bus
+
+    with _lock:
+        _reset_after_fork()
+
+        if namespace not in NEAR_CACHES:
+            config: dict | None = getattr(settings, "CACHE_NEAR", {}).get(namespace)
+
+            if config is not None and bus.subscribe(CHANNEL, _on_invalidate):
+                NEAR_CACHES[namespace] = NearCache(namespace, config["size"], config["ttl"])
+            else:
+                NEAR_CACHES[namespace] = None
+
+    return NEAR_CACHES[namespace]
+
+
+def near_cache_stats() -> dict[str, dict[str, int]]:
+    return {
+        namespace: near_cache.stats()
+        for namespace, near_cache in NEAR_CACHES.items()
+        if near_cache is not None
+    }
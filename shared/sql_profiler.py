@@ -0,0 +1,201 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Iterator
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+# collapse "IN (%s, %s, ...)" so one shape covers every list length
+IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+
+
+def query_shape(sql: str) -> str:
+    return IN_LIST.sub("(...)", sql)
+
+
+def get_config() -> dict:
+    return {
+        "sample_rate": 0.0,
+        "buffer": 200,
+        "slowest": 5,
+        "repeat_threshold": 5,
+        **getattr(settings, "SQL_PROFILER", {}),
+    }
+
+
+@dataclass
+class QueryProfile:
+    """Queries issued by one view or task"""
+
+    name: str
+    kind: str
+    queries: int = 0
+    duration_ms: float = 0.0
+    slowest: list[tuple[float, str]] = field(default_factory=list)
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, sql: str, duration_ms: float, keep: int):
+        self.queries += 1
+        self.duration_ms += duration_ms
+        self.shapes[query_shape(sql)] += 1
+
+        if len(self.slowest) < keep or duration_ms > self.slowest[-1][0]:
+            self.slowest.append((duration_ms, sql))
+            self.slowest.sort(key=lambda entry: -entry[0])
+            del self.slowest[keep:]
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Query shapes run at least ``threshold`` times, usually an N+1"""
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+    def to_dict(self, threshold: int) -> dict:
+        data = asdict(self)
+        data.pop("shapes")
+        data["duration_ms"] = round(self.duration_ms, 3)
+        data["slowest"] = [[round(ms, 3), sql] for ms, sql in self.slowest]
+        data["repeated"] = self.repeated(threshold)
+        data["at"] = time.time()
+
+        return data
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook that times every statement"""
+
+    def __init__(self, profile: QueryProfile, keep: int):
+        self.profile = profile
+        self.keep = keep
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.profile.record(sql, (time.perf_counter() - started) * 1000, self.keep)
+
+
+_buffer: deque[dict] | None = None
+_lock = threading.Lock()
+
+
+def recent_profiles() -> list[dict]:
+    """Newest first"""
+    with _lock:
+        return list(reversed(_buffer or ()))
+
+
+@contextmanager
+def profile_queries(
+    name: str, kind: str, sample_rate: float | None = None
+) -> Iterator[QueryProfile | None]:
+    """
+    Record the queries of the block for a ``sample_rate`` share of calls.
+
+    ``sample_rate`` defaults to the configured one. Sampled profiles are
+    printed as one JSON line and kept in a ring buffer served by
+    ``shared.views.sql_profiles``.
+    """
+    global _buffer
+    config = get_config()
+
+    if random.random() >= (config["sample_rate"] if sample_rate is None else sample_rate):
+        yield None
+        return
+
+    profile = QueryProfile(name=name, kind=kind)
+
+    with connection.execute_wrapper(QueryRecorder(profile, config["slowest"])):
+        try:
+            yield profile
+        finally:
+            data = profile.to_dict(config["repeat_threshold"])
+
+            with _lock:
+                if _buffer is None:
+                    _buffer = deque(maxlen=config["buffer"])
+                _buffer.append(data)
+
+            print(json.dumps({"event": "sql_profile", **data}))
+
+
+def _name_profile(profile: QueryProfile | None, request):
+    # the URL pattern groups every request of a view together
+    if profile is not None and request.resolver_match is not None:
+        profile.name = request.resolver_match.route or profile.name
+
+
+class SQLProfilerMiddleware:
+    """
+    Profile the queries of a sampled share of requests.
+
+    Works in both sync and async chains, so ASGI requests (the SSE views
+    included) are not pushed through a sync adapter. Not installed at all
+    when ``sample_rate`` is 0.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if get_config()["sample_rate"] <= 0:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with profile_queries(request.path, "view") as profile:
+            response = self.get_response(request)
+            _name_profile(profile, request)
+
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= get_config()["sample_rate"]:
+            return await self.get_response(request)
+
+        # ORM calls of async requests run in the request's thread-sensitive
+        # thread, the query hook has to be installed on that thread's connection
+        context = profile_queries(request.path, "view", sample_rate=1.0)
+        profile = await sync_to_async(context.__enter__)()
+        try:
+            response = await self.get_response(request)
+            _name_profile(profile, request)
+        finally:
+            await sync_to_async(context.__exit__)(None, None, None)
+
+        return response
+
+
+# open task profiles by task id, prerun and postrun run in the worker thread
+_tasks: dict[str, AbstractContextManager] = {}
+
+
+def _task_prerun(task_id=None, task=None, **kwargs):
+    context = profile_queries(task.name, "task")
+    context.__enter__()
+    _tasks[task_id] = context
+
+
+def _task_postrun(task_id=None, **kwargs):
+    context = _tasks.pop(task_id, None)
+    if context is not None:
+        context.__exit__(None, None, None)
+
+
+def install_celery_hooks():
+    task_prerun.connect(_task_prerun, weak=False)
+    task_postrun.connect(_task_postrun, weak=False)
@@ -0,0 +1,323 @@
+import json
+import os
+import time
+import weakref
+import zlib
+from contextlib import asynccontextmanager
+from unittest import mock
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from . import cache as cache_module
+from . import codecs
+from .cache import AsyncCacheService, CacheService
+from .near_cache import CHANNEL as NEAR_CACHE_CHANNEL, NEAR_CACHES, NearCache, get_near_cache
+
+# flushed before every test, keep it away from the application database
+REDIS_URL = os.getenv("TEST_REDIS_URL", default="redis://localhost:6379/15")
+NAMESPACE = "cache_tests"
+
+COUNTED_UPDATES = [
+    ("1", "kfc:status", "cooking"),
+    ("1", "silpo:status", "cooked"),
+    ("1", "kfc:status", "cooked"),
+    ("1", "kfc:status", "cooked"),
+    ("2", "kfc:status", "cooked"),
+]
+
+
+@asynccontextmanager
+async def async_cache():
+    async with redis.asyncio.Redis.from_url(REDIS_URL) as connection:
+        yield AsyncCacheService(connection)
+
+
+class RedisTestMixin:
+    """
+    Run a test against the empty ``REDIS_URL`` database, skip it without Redis.
+
+    ``self.redis`` and ``self.cache`` are bound to that database, and so are
+    the process-wide pools used by the code under test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.redis = redis.Redis.from_url(REDIS_URL)
+        self.addCleanup(self.redis.close)
+
+        try:
+            self.redis.flushdb()
+        except redis.ConnectionError:
+            self.skipTest(f"Redis is not available at {REDIS_URL}")
+
+        self.cache = CacheService(self.redis)
+
+        self.enterContext(
+            override_settings(CACHES={"default": {**settings.CACHES["default"], "LOCATION": REDIS_URL}})
+        )
+        self.enterContext(mock.patch.object(cache_module, "_pool", None))
+        self.enterContext(mock.patch.object(cache_module, "_async_pools", weakref.WeakKeyDictionary()))
+
+        for near_cache in NEAR_CACHES.values():
+            if near_cache is not None:
+                near_cache.invalidate()
+
+
+class CacheParityTests(RedisTestMixin, SimpleTestCase):
+    """``CacheService`` and ``AsyncCacheService`` against a real (or fake) Redis"""
+
+    def pending(self):
+        self.cache.set_fields(NAMESPACE, "1", {"meta:pending": 2})
+        self.cache.set_fields(NAMESPACE, "2", {"meta:pending": 1})
+
+    def stored(self) -> dict:
+        return {
+            "1": self.cache.get_fields(NAMESPACE, "1"),
+            "2": self.cache.get_fields(NAMESPACE, "2"),
+            "members": self.cache.members(NAMESPACE, "members"),
+            "recent": self.cache.recent(NAMESPACE, "recent", 10),
+            "positions": self.cache.get_positions(NAMESPACE, "geo", ["a", "b"]),
+        }
+
+    async def test_values_written_by_one_client_are_read_by_the_other(self):
+        self.cache.set(NAMESPACE, "sync", {"value": 1})
+
+        async with async_cache() as cache:
+            await cache.set(NAMESPACE, "async", {"value": 2})
+            await cache.set_fields(NAMESPACE, "hash", {"status": "cooked", "count": 3})
+
+            self.assertEqual(await cache.get(NAMESPACE, "sync"), {"value": 1})
+            self.assertEqual(
+                await cache.get_many(NAMESPACE, ["sync", "async", "missing"]),
+                self.cache.get_many(NAMESPACE, ["sync", "async", "missing"]),
+            )
+            self.assertEqual(
+                await cache.get_fields(NAMESPACE, "hash"),
+                self.cache.get_fields(NAMESPACE, "hash"),
+            )
+
+        self.assertEqual(self.cache.get(NAMESPACE, "async"), {"value": 2})
+        self.assertEqual(self.cache.get_field(NAMESPACE, "hash", "count"), 3)
+
+    async def test_set_fields_counted_matches(self):
+        self.pending()
+        expected = self.cache.set_fields_counted(
+            NAMESPACE, COUNTED_UPDATES, counter="meta:pending", target="cooked"
+        )
+        expected_stored = self.stored()
+
+        self.redis.flushdb()
+        self.pending()
+        async with async_cache() as cache:
+            results = await cache.set_fields_counted(
+                NAMESPACE, COUNTED_UPDATES, counter="meta:pending", target="cooked"
+            )
+
+        self.assertEqual(
+            expected, [(True, None), (True, 1), (True, 0), (False, None), (True, 0)]
+        )
+        self.assertEqual(results, expected)
+        self.assertEqual(self.stored(), expected_stored)
+
+    async def test_compare_and_set_field_matches(self):
+        steps = [(None, "cooking"), (None, "cooked"), ("cooking", "cooked"), ("cooking", "failed")]
+
+        expected = [
+            self.cache.compare_and_set_field(NAMESPACE, "1", "status", expected, value)
+            for expected, value in steps
+        ]
+
+        self.redis.flushdb()
+        async with async_cache() as cache:
+            results = [
+                await cache.compare_and_set_field(NAMESPACE, "1", "status", expected, value)
+                for expected, value in steps
+            ]
+
+        self.assertEqual(expected, [True, False, True, False])
+        self.assertEqual(results, expected)
+        self.assertEqual(self.cache.get_field(NAMESPACE, "1", "status"), "cooked")
+
+    async def test_pipelines_write_the_same_state(self):
+        positions = {"a": (50.45, 30.52), "b": (50.44, 30.51)}
+
+        with self.cache.pipeline(transaction=False) as pipeline:
+            pipeline.set_fields(NAMESPACE, "1", {"kfc:status": "cooked"})
+            pipeline.add_member(NAMESPACE, "members", "1")
+            pipeline.push_recent(NAMESPACE, "recent", b"first", 2)
+            pipeline.push_recent(NAMESPACE, "recent", b"second", 2)
+            pipeline.push_recent(NAMESPACE, "recent", b"third", 2)
+            pipeline.add_positions(NAMESPACE, "geo", positions)
+        expected = self.stored()
+
+        self.redis.flushdb()
+        async with async_cache() as cache:
+            async with cache.pipeline(transaction=False) as pipeline:
+                await pipeline.set_fields(NAMESPACE, "1", {"kfc:status": "cooked"})
+                await pipeline.add_member(NAMESPACE, "members", "1")
+                await pipeline.push_recent(NAMESPACE, "recent", b"first", 2)
+                await pipeline.push_recent(NAMESPACE, "recent", b"second", 2)
+                await pipeline.push_recent(NAMESPACE, "recent", b"third", 2)
+                await pipeline.add_positions(NAMESPACE, "geo", positions)
+
+            self.assertEqual(
+                await cache.get_positions(NAMESPACE, "geo", ["a", "b"]), expected["positions"]
+            )
+            self.assertEqual(await cache.recent(NAMESPACE, "recent", 10), [b"third", b"second"])
+
+        self.assertEqual(self.stored(), expected)
+
+    async def test_pipelines_reject_methods_with_results(self):
+        with self.cache.pipeline(transaction=False) as pipeline:
+            with self.assertRaises(TypeError):
+                pipeline.set_fields_counted(
+                    NAMESPACE, COUNTED_UPDATES, counter="meta:pending", target="cooked"
+                )
+            with self.assertRaises(TypeError):
+                pipeline.compare_and_set_field(NAMESPACE, "1", "status", None, "cooked")
+
+        async with async_cache() as cache:
+            async with cache.pipeline(transaction=False) as pipeline:
+                with self.assertRaises(TypeError):
+                    await pipeline.set_fields_counted(
+                        NAMESPACE, COUNTED_UPDATES, counter="meta:pending", target="cooked"
+                    )
+                with self.assertRaises(TypeError):
+                    await pipeline.compare_and_set_field(NAMESPACE, "1", "status", None, "cooked")
+
+        self.assertEqual(self.cache.get_fields(NAMESPACE, "1"), {})
+
+
+ZLIB = codecs.Compressor(9, "zlib", zlib.compress, zlib.decompress)
+
+
+@mock.patch.dict(codecs.COMPRESSORS_BY_ID, {ZLIB.id: ZLIB})
+class ValueCodecTests(SimpleTestCase):
+    value = {"dishes": [{"id": 1, "name": "Borsch", "price": 120.5}] * 20}
+
+    def test_containers_round_trip_with_every_installed_codec(self):
+        for name in codecs.CODECS:
+            with self.subTest(codec=name):
+                data = codecs.build_value_codec(name).encode(self.value)
+
+                self.assertTrue(data.startswith(codecs.MAGIC))
+                self.assertEqual(codecs.ValueCodec.decode(data), self.value)
+
+    def test_scalars_are_stored_as_plain_json(self):
+        value_codec = codecs.ValueCodec(codecs.CODECS["json"], ZLIB, threshold=0)
+
+        for value in ("cooked", 3, 1.5, True, None):
+            with self.subTest(value=value):
+                self.assertEqual(value_codec.encode(value), json.dumps(value).encode())
+                self.assertEqual(codecs.ValueCodec.decode(value_codec.encode(value)), value)
+
+    def test_values_written_before_the_header_are_read_as_json(self):
+        self.assertEqual(codecs.ValueCodec.decode(json.dumps(self.value).encode()), self.value)
+
+    def test_payloads_are_compressed_from_the_threshold(self):
+        payload = codecs.CODECS["json"].dumps(self.value)
+
+        for threshold, compressor in ((len(payload), ZLIB), (len(payload) + 1, codecs.COMPRESSORS["none"])):
+            with self.subTest(threshold=threshold):
+                data = codecs.ValueCodec(codecs.CODECS["json"], ZLIB, threshold).encode(self.value)
+
+                self.assertEqual(data[len(codecs.MAGIC) + 1], compressor.id)
+                self.assertEqual(codecs.ValueCodec.decode(data), self.value)
+
+    def test_unknown_headers_are_rejected(self):
+        with self.assertRaises(ValueError):
+            codecs.ValueCodec.decode(codecs.MAGIC + bytes((99, 0)) + b"{}")
+
+    def test_unknown_codecs_are_rejected_on_build(self):
+        with self.assertRaises(ImproperlyConfigured):
+            codecs.build_value_codec("pickle")
+
+    @override_settings(CACHE_CODECS={"default": {"threshold": 10}, NAMESPACE: {"threshold": 20}})
+    def test_namespace_settings_are_merged_over_the_default(self):
+        with mock.patch.dict(codecs._value_codecs, clear=True):
+            self.assertEqual(codecs.get_value_codec(NAMESPACE).threshold, 20)
+            self.assertEqual(codecs.get_value_codec("other").threshold, 10)
+
+
+class NearCacheTests(SimpleTestCase):
+    def test_values_fetched_across_an_invalidation_are_not_stored(self):
+        near_cache = NearCache(NAMESPACE, size=10, ttl=60)
+        token = near_cache.begin()
+
+        near_cache.invalidate("1")
+        near_cache.set("1", b"stale", token)
+
+        self.assertEqual(near_cache.get("1"), (False, None))
+
+        near_cache.set("1", b"fresh", near_cache.begin())
+        self.assertEqual(near_cache.get("1"), (True, b"fresh"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        near_cache = NearCache(NAMESPACE, size=2, ttl=60)
+
+        for key in ("1", "2"):
+            near_cache.set(key, key.encode(), near_cache.begin())
+        near_cache.get("1")
+        near_cache.set("3", b"3", near_cache.begin())
+
+        self.assertEqual(near_cache.get("2"), (False, None))
+        self.assertEqual(near_cache.get("1"), (True, b"1"))
+        self.assertEqual(near_cache.stats()["evictions"], 1)
+
+    def test_expired_entries_are_missed(self):
+        near_cache = NearCache(NAMESPACE, size=10, ttl=-1)
+        near_cache.set("1", b"1", near_cache.begin())
+
+        self.assertEqual(near_cache.get("1"), (False, None))
+        self.assertEqual(near_cache.stats()["expirations"], 1)
+
+
+@override_settings(CACHE_NEAR={NAMESPACE: {"size": 10, "ttl": 60}})
+class NearCacheInvalidationTests(RedisTestMixin, SimpleTestCase):
+    """Near cache of ``CacheService`` kept in sync over the invalidation channel"""
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.dict(NEAR_CACHES))
+        NEAR_CACHES.pop(NAMESPACE, None)
+
+        if get_near_cache(NAMESPACE) is None:
+            self.skipTest("Invalidation bus is not available")
+
+    def wait_for(self, key: str, expected: dict):
+        deadline = time.monotonic() + 5
+        while self.cache.get(NAMESPACE, key) != expected and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        self.assertEqual(self.cache.get(NAMESPACE, key), expected)
+
+    def test_writes_of_this_process_are_read_back(self):
+        self.cache.set(NAMESPACE, "1", {"status": "cooking"})
+        self.assertEqual(self.cache.get(NAMESPACE, "1"), {"status": "cooking"})
+
+        self.cache.set(NAMESPACE, "1", {"status": "cooked"})
+        self.assertEqual(self.cache.get(NAMESPACE, "1"), {"status": "cooked"})
+
+    def test_writes_of_other_processes_are_read_after_their_broadcast(self):
+        self.cache.set(NAMESPACE, "1", {"status": "cooking"})
+        self.assertEqual(self.cache.get(NAMESPACE, "1"), {"status": "cooking"})
+
+        # another process writes behind this process' near cache...
+        self.redis.set(f"{NAMESPACE}:1", json.dumps({"status": "cooked"}))
+        self.assertEqual(self.cache.get(NAMESPACE, "1"), {"status": "cooking"})
+
+        # ...and then broadcasts the key
+        self.redis.publish(NEAR_CACHE_CHANNEL, f"{NAMESPACE}:1")
+        self.wait_for("1", {"status": "cooked"})
+
+    def test_a_listener_reconnect_drops_everything(self):
+        self.cache.set(NAMESPACE, "1", {"status": "cooking"})
+        self.cache.get(NAMESPACE, "1")
+        self.redis.set(f"{NAMESPACE}:1", json.dumps({"status": "cooked"}))
+
+        self.redis.publish(NEAR_CACHE_CHANNEL, "")
+        self.wait_for("1", {"status": "cooked"})
@@ -0,0 +1,24 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from food.providers.pool import pool_stats
+
+from .near_cache import near_cache_stats
+from .sql_profiler import recent_profiles
+
+
+@staff_member_required
+def sql_profiles(request):
+    """
+    Recent sampled query profiles of this process, ``?repeated=1`` keeps N+1 suspects only.
+
+    Near-cache and provider HTTP pool counters of the process are included.
+    """
+    profiles = recent_profiles()
+
+    if request.GET.get("repeated"):
+        profiles = [profile for profile in profiles if profile["repeated"]]
+
+    return JsonResponse(
+        {"profiles": profiles, "near_caches": near_cache_stats(), "http_pools": pool_stats()}
+    )